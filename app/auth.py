@@ -1,32 +1,63 @@
+import os
 import jwt as pyjwt
 from datetime import datetime, timedelta, timezone
-from passlib.context import CryptContext
+from functools import lru_cache, partial
 from typing import Optional
-import os
-from dotenv import load_dotenv
-from google.oauth2 import id_token
-from google.auth.transport import requests
-
-
+from starlette.concurrency import run_in_threadpool
+from app.config import JWT_SECRET_KEY, GOOGLE_CLIENT_ID
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.deadlines import timeout_for
 
-# Load environment variables from .env file
-load_dotenv()
 
 # Use the JWT_SECRET_KEY from the environment variable
-SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+SECRET_KEY = JWT_SECRET_KEY
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7  # Refresh token expiration time
+# Seconds to wait on Google's token and certificate endpoints, less if the request's deadline is nearer
+GOOGLE_TIMEOUT = float(os.getenv("GOOGLE_TIMEOUT", "10"))
+
+
+@lru_cache
+def get_pwd_context():
+    # Create the password context on first use; passlib is slow to import
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def google_request():
+    # google-auth's HTTP transport, with a timeout on every call made through it
+    from google.auth.transport import requests
+    return partial(requests.Request(), timeout=timeout_for(GOOGLE_TIMEOUT))
+
+
+def _is_google_outage(error: Exception):
+    # Invalid tokens and codes are the caller's problem; only failing to reach Google counts
+    from google.auth.exceptions import TransportError
+    from requests.exceptions import ConnectionError, Timeout
+    return isinstance(error, (TransportError, ConnectionError, Timeout))
+
+
+google_breaker = CircuitBreaker("google", is_failure=_is_google_outage)
+
+
+def _verify_id_token(token: str):
+    # Blocking: google-auth fetches Google's certificates over requests.
+    # Imported here to keep google-auth and requests out of startup
+    from google.oauth2 import id_token
+
+    with google_breaker.guard():
+        return id_token.verify_oauth2_token(token, google_request(), GOOGLE_CLIENT_ID)
 
-# Create a password context for hashing passwords
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+async def verify_google_id_token(token: str) -> dict:
+    # The claims of a Google ID token, verified off the event loop
+    return await run_in_threadpool(_verify_id_token, token)
 
-GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 
 async def verify_google_token(token: str):
     try:
-        idinfo = id_token.verify_oauth2_token(token, requests.Request(), GOOGLE_CLIENT_ID)
+        idinfo = await verify_google_id_token(token)
 
         # Extract user info
         google_id = idinfo["sub"]
@@ -72,13 +103,13 @@ def verify_password(plain_password, hashed_password):
     """
     Verify if the plain password matches the hashed password.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str):
     """
     Generate a hashed password using bcrypt.
     """
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_token(token: str):
     """
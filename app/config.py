@@ -0,0 +1,22 @@
+import os
+from dotenv import load_dotenv
+
+# Read .env once, before any other module looks at the environment.
+# Tuning knobs stay next to the code they tune; settings shared across modules live here.
+load_dotenv()
+
+ENV = os.getenv("ENV", "development")
+
+MONGO_URI = os.getenv("MONGO_URI")
+
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+
+GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
+GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
+GOOGLE_CLIENT_SECRETS = os.getenv("GOOGLE_CLIENT_SECRETS")
+GOOGLE_REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI")
+
+EMAIL_WEB_URL = os.getenv("EMAIL_WEB_URL")
+
+# "cloudinary" in production, "local" to keep images on disk (development, load tests)
+MEDIA_STORAGE = os.getenv("MEDIA_STORAGE", "cloudinary")
@@ -1,13 +1,15 @@
 import datetime
 from bson import ObjectId
-from fastapi import HTTPException
+from fastapi import BackgroundTasks, HTTPException
 from pymongo import DESCENDING
 from app.schemas.announcement import AnnouncementSchema
-from app.utils.delete_images import delete_images_from_cloudinary
+from app.utils.delete_images import delete_images
 from typing import List, Dict
 from app.db.connection import db  
+from app.services.snapshots import refreshes_snapshot
 
 # Create a new announcement
+@refreshes_snapshot("announcements")
 async def create_announcement(announcement_data: AnnouncementSchema, images: List[str]):
     announcement_dict = announcement_data.model_dump()
     announcement_dict["images"] = images
@@ -36,6 +38,7 @@ async def get_all_announcements(limit: int, skip: int):
     return announcements
 
 # Update an existing announcement by its ID
+@refreshes_snapshot("announcements")
 async def update_announcement(announcement_id: str, updated_data: Dict):
     # Find the announcement by ID
     announcement = await db.announcements_database.announcements.find_one({"_id": ObjectId(announcement_id)})
@@ -59,28 +62,20 @@ async def update_announcement(announcement_id: str, updated_data: Dict):
     return updated_announcement
 
 # Delete an announcement by its ID
-async def delete_announcement(announcement_id: str):
+@refreshes_snapshot("announcements")
+async def delete_announcement(announcement_id: str, background_tasks: BackgroundTasks):
     try:
         # Validate the announcement ID
         if not ObjectId.is_valid(announcement_id):
             raise HTTPException(status_code=400, detail="Invalid announcement ID format")
 
-        # Find the announcement by ID
-        announcement = await db.announcements_database.announcements.find_one({"_id": ObjectId(announcement_id)})
+        # Remove the announcement first so the response doesn't wait on image storage
+        announcement = await db.announcements_database.announcements.find_one_and_delete({"_id": ObjectId(announcement_id)})
         if not announcement:
             raise HTTPException(status_code=404, detail="Announcement not found")
 
-        # Delete images from Cloudinary
-        try:
-            await delete_images_from_cloudinary(announcement["images"])
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error deleting images: {str(e)}")
-
-        # Delete the announcement
-        result = await db.announcements_database.announcements.delete_one({"_id": ObjectId(announcement_id)})
-
-        if result.deleted_count == 0:
-            raise HTTPException(status_code=400, detail="Failed to delete the announcement")
+        # Queue the image cleanup to run after the response is sent
+        background_tasks.add_task(delete_images, announcement.get("images", []))
 
         return {"id": announcement_id, "message": "Announcement deleted successfully"}
 
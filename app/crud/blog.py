@@ -1,14 +1,16 @@
 import datetime
 from bson import ObjectId
-from fastapi import HTTPException
+from fastapi import BackgroundTasks, HTTPException
 from pymongo import DESCENDING
 from app.schemas.blog import BlogSchema
 from typing import List
 from app.db.connection import db  # Assuming you have a MongoDB model for Blog
 import slugify
-from app.utils.delete_images import delete_images_from_cloudinary
+from app.utils.delete_images import delete_images
+from app.services.snapshots import refreshes_snapshot
 
 # Create a new blog post
+@refreshes_snapshot("blogs")
 async def create_blog(blog_data: BlogSchema, images: List[str]):
     blog_dict = blog_data.model_dump()
     blog_dict["images"] = images
@@ -32,6 +34,7 @@ async def get_all_blogs(limit: int, skip: int):
     return blogs
 
 # Update an existing blog post by its ID
+@refreshes_snapshot("blogs")
 async def update_blog(blog_id: str, updated_data: BlogSchema, images: List[str]):
     # Find the blog post by ID
     blog = await db.blogs_database.blogs.find_one({"_id": ObjectId(blog_id)})
@@ -59,28 +62,20 @@ async def update_blog(blog_id: str, updated_data: BlogSchema, images: List[str])
     return updated_blog
 
 # Delete a blog post by its ID
-async def delete_blog(blog_id: str):
+@refreshes_snapshot("blogs")
+async def delete_blog(blog_id: str, background_tasks: BackgroundTasks):
     try:
         # Validate the blog ID
         if not ObjectId.is_valid(blog_id):
             raise HTTPException(status_code=400, detail="Invalid blog ID format")
 
-        # Find the blog post by ID
-        blog = await db.blogs_database.blogs.find_one({"_id": ObjectId(blog_id)})
+        # Remove the blog post first so the response doesn't wait on image storage
+        blog = await db.blogs_database.blogs.find_one_and_delete({"_id": ObjectId(blog_id)})
         if not blog:
             raise HTTPException(status_code=404, detail="Blog post not found")
 
-        # Delete images from Cloudinary
-        try:
-            await delete_images_from_cloudinary(blog["images"])
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error deleting images: {str(e)}")
-
-        # Delete the blog post
-        result = await db.blogs_database.blogs.delete_one({"_id": ObjectId(blog_id)})
-
-        if result.deleted_count == 0:
-            raise HTTPException(status_code=400, detail="Failed to delete the blog post")
+        # Queue the image cleanup to run after the response is sent
+        background_tasks.add_task(delete_images, blog.get("images", []))
 
         return {"id": blog_id, "message": "Blog post deleted successfully"}
 
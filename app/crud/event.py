@@ -1,13 +1,15 @@
 from bson import ObjectId
-from fastapi import HTTPException
+from fastapi import BackgroundTasks, HTTPException
 from pymongo import DESCENDING
 from app.schemas.event import EventSchema
 from typing import List
 from app.db.connection import db  # Assuming you have a MongoDB model for Event
 import datetime
-from app.utils.delete_images import delete_images_from_cloudinary
+from app.utils.delete_images import delete_images
+from app.services.snapshots import refreshes_snapshot
 
 
+@refreshes_snapshot("events")
 async def create_event(event_data: EventSchema, images: List[str]):
     try:
         # Prepare the event data from the Pydantic schema
@@ -59,6 +61,7 @@ async def get_event_by_id(event_id: str):
         raise HTTPException(status_code=500, detail=f"Error fetching event: {str(e)}")
 
 
+@refreshes_snapshot("events")
 async def update_event(event_id: str, updated_data: EventSchema, images: List[str]):
     try:
         # Find the event to update
@@ -89,28 +92,20 @@ async def update_event(event_id: str, updated_data: EventSchema, images: List[st
         raise HTTPException(status_code=500, detail=f"Error updating event: {str(e)}")
 
 
-async def delete_event(event_id: str):
+@refreshes_snapshot("events")
+async def delete_event(event_id: str, background_tasks: BackgroundTasks):
     try:
         # Validate the event ID
         if not ObjectId.is_valid(event_id):
             raise HTTPException(status_code=400, detail="Invalid event ID format")
 
-        # Find the event to delete
-        event = await db.events_database.events.find_one({"_id": ObjectId(event_id)})
+        # Remove the event first so the response doesn't wait on image storage
+        event = await db.events_database.events.find_one_and_delete({"_id": ObjectId(event_id)})
         if not event:
             raise HTTPException(status_code=404, detail="Event not found")
 
-        # Delete images from Cloudinary
-        try:
-            await delete_images_from_cloudinary(event["images"])
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error deleting images: {str(e)}")
-
-        # Delete the event from the database
-        result = await db.events_database.events.delete_one({"_id": ObjectId(event_id)})
-
-        if result.deleted_count == 0:
-            raise HTTPException(status_code=400, detail="Failed to delete the event")
+        # Queue the image cleanup to run after the response is sent
+        background_tasks.add_task(delete_images, event.get("images", []))
 
         return {"id": event_id, "message": "Event deleted successfully"}
 
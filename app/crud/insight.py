@@ -4,10 +4,12 @@ from app.schemas.insight import InsightsSchema
 from typing import List
 from app.db.connection import db  # Assuming you have a MongoDB model for Insight
 import datetime
-from fastapi import HTTPException
-from app.utils.delete_images import delete_images_from_cloudinary
+from fastapi import BackgroundTasks, HTTPException
+from app.utils.delete_images import delete_images
+from app.services.snapshots import refreshes_snapshot
 
 
+@refreshes_snapshot("insights")
 async def create_insight(insight_data: InsightsSchema, images: List[str]):
     try:
         # Prepare the insight data from the Pydantic schema
@@ -58,6 +60,7 @@ async def get_insight_by_id(insight_id: str):
         raise HTTPException(status_code=500, detail=f"Error fetching insight: {str(e)}")
 
 
+@refreshes_snapshot("insights")
 async def update_insight(insight_id: str, updated_data: InsightsSchema, images: List[str]):
     try:
         # Find the insight to update
@@ -88,28 +91,20 @@ async def update_insight(insight_id: str, updated_data: InsightsSchema, images:
         raise HTTPException(status_code=500, detail=f"Error updating insight: {str(e)}")
 
 
-async def delete_insight(insight_id: str):
+@refreshes_snapshot("insights")
+async def delete_insight(insight_id: str, background_tasks: BackgroundTasks):
     try:
         # Validate the insight ID
         if not ObjectId.is_valid(insight_id):
             raise HTTPException(status_code=400, detail="Invalid insight ID format")
 
-        # Find the insight to delete
-        insight = await db.insights_database.insights.find_one({"_id": ObjectId(insight_id)})
+        # Remove the insight first so the response doesn't wait on image storage
+        insight = await db.insights_database.insights.find_one_and_delete({"_id": ObjectId(insight_id)})
         if not insight:
             raise HTTPException(status_code=404, detail="Insight not found")
 
-        # Delete images from Cloudinary
-        try:
-            await delete_images_from_cloudinary(insight["images"])
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error deleting images: {str(e)}")
-
-        # Delete the insight from the database
-        result = await db.insights_database.insights.delete_one({"_id": ObjectId(insight_id)})
-
-        if result.deleted_count == 0:
-            raise HTTPException(status_code=400, detail="Failed to delete the insight")
+        # Queue the image cleanup to run after the response is sent
+        background_tasks.add_task(delete_images, insight.get("images", []))
 
         return {"id": insight_id, "message": "Insight deleted successfully"}
 
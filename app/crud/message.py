@@ -14,7 +14,7 @@ async def create_message(message: MessageCreate):
     del message_dict["_id"]
     
     if result.acknowledged:
-        await manager.broadcast(message_dict)
+        await manager.broadcast(message_dict, topic="messages")
         return  MessageResponse(**message_dict)
     raise HTTPException(status_code=500, detail="Failed to send message")
 
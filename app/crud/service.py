@@ -1,8 +1,10 @@
 from app.db.connection import db
 from app.schemas.service import ServiceCreate
 from bson import ObjectId
+from app.services.snapshots import refreshes_snapshot
 
 # Create a new service
+@refreshes_snapshot("services")
 async def create_service(service: ServiceCreate):
     service_dict = service.model_dump()
     result = await db.services_database.services.insert_one(service_dict)
@@ -10,12 +12,13 @@ async def create_service(service: ServiceCreate):
 
 # Get all services
 async def get_services():
-    services = await db.services.find().to_list(100)  # Fetch up to 100 services
+    services = await db.services_database.services.find().to_list(100)  # Fetch up to 100 services
     return [{"id": str(service["_id"]), **service} for service in services]
 
 # Delete a service by its ID
+@refreshes_snapshot("services")
 async def delete_service(service_id: str):
-    result = await db.services.delete_one({"_id": ObjectId(service_id)})
+    result = await db.services_database.services.delete_one({"_id": ObjectId(service_id)})
     if result.deleted_count == 1:
         return {"message": "Service deleted successfully"}
     return {"message": "Service not found"}
@@ -1,9 +1,6 @@
-import os
 import motor.motor_asyncio
-from dotenv import load_dotenv
+from app.config import MONGO_URI
+from app.db.monitoring import command_monitor
 
-load_dotenv()
-
-MONGO_URI =os.getenv("MONGO_URI")
-client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
+client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI, event_listeners=[command_monitor])
 db = client
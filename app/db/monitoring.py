@@ -0,0 +1,162 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from pymongo import monitoring
+from app.utils.metrics import Histogram, format_labels
+
+logger = logging.getLogger(__name__)
+
+# Commands slower than this are kept in the slow-query log
+SLOW_QUERY_MS = float(os.getenv("MONGO_SLOW_QUERY_MS", "100"))
+# Most recent slow commands kept per worker
+SLOW_QUERY_LOG_SIZE = int(os.getenv("MONGO_SLOW_QUERY_LOG_SIZE", "200"))
+
+# Buckets for command latency in seconds; most commands finish well under a request
+COMMAND_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Set by the usage middleware so commands can be traced back to the route that issued them
+request_scope: ContextVar = ContextVar("request_scope", default=None)
+
+
+def current_route():
+    scope = request_scope.get()
+    if scope is None:
+        return None
+    route = scope.get("route")
+    return getattr(route, "path", None) or scope.get("path")
+
+
+def query_shape(value, depth: int = 0):
+    # Keep field names and operators, drop the values, so the same query always has the same shape
+    if depth > 5:
+        return "?"
+    if isinstance(value, dict):
+        return {key: query_shape(item, depth + 1) for key, item in value.items()}
+    if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+        # $and / $or / pipelines are lists of sub-documents
+        return [query_shape(item, depth + 1) for item in value]
+    return "?"
+
+
+def _filter_of(command_name: str, command: dict):
+    if command_name == "find":
+        return command.get("filter")
+    if command_name in ("count", "distinct", "findAndModify"):
+        return command.get("query")
+    if command_name in ("update", "delete"):
+        statements = command.get("updates" if command_name == "update" else "deletes") or []
+        return statements[0].get("q") if statements else None
+    if command_name == "aggregate":
+        return command.get("pipeline")
+    return None
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """
+    Records latency and errors per collection and command, and keeps the
+    slowest recent commands with their filter shape and calling route.
+    Listener callbacks run on Motor's executor threads, hence the lock.
+    """
+
+    def __init__(self, slow_query_ms: float = SLOW_QUERY_MS, log_size: int = SLOW_QUERY_LOG_SIZE):
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.lock = threading.Lock()
+        # (connection_id, request_id) -> (collection, command_name, command, route)
+        self.pending = {}
+        self.latency = {}  # (collection, command_name) -> Histogram
+        self.errors = defaultdict(int)  # (collection, command_name) -> count
+        self.slow_queries = deque(maxlen=log_size)
+
+    def started(self, event):
+        # Sensitive commands (auth, hello) arrive redacted with an empty body
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        if not isinstance(target, str):
+            return
+        collection = f"{event.database_name}.{target}"
+        self.pending[(event.connection_id, event.request_id)] = (collection, event.command_name, event.command, current_route())
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool):
+        started = self.pending.pop((event.connection_id, event.request_id), None)
+        if started is None:
+            return
+        collection, command_name, command, route = started
+        duration = event.duration_micros / 1_000_000
+        key = (collection, command_name)
+
+        with self.lock:
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram(COMMAND_BUCKETS)
+            histogram.observe(duration)
+            if failed:
+                self.errors[key] += 1
+
+        if duration >= self.slow_query_seconds:
+            entry = {
+                "at": time.time(),
+                "collection": collection,
+                "command": command_name,
+                "duration_ms": round(duration * 1000, 2),
+                "filter": query_shape(_filter_of(command_name, command)),
+                "route": route,
+                "failed": failed,
+            }
+            if command_name == "find" and command.get("sort"):
+                entry["sort"] = query_shape(command["sort"])
+            with self.lock:
+                self.slow_queries.append(entry)
+
+    def summary(self):
+        with self.lock:
+            items = [(key, histogram.count, histogram.sum) for key, histogram in self.latency.items()]
+            errors = dict(self.errors)
+            slow_queries = list(self.slow_queries)
+        commands = [
+            {
+                "collection": collection,
+                "command": command_name,
+                "count": count,
+                "errors": errors.get((collection, command_name), 0),
+                "mean_ms": round(total / count * 1000, 2) if count else 0,
+                "total_ms": round(total * 1000, 2),
+            }
+            for (collection, command_name), count, total in items
+        ]
+        commands.sort(key=lambda item: item["total_ms"], reverse=True)
+        return {
+            "slow_query_ms": self.slow_query_seconds * 1000,
+            "commands": commands,
+            "slow_queries": slow_queries[::-1],
+        }
+
+    def render(self):
+        with self.lock:
+            latency = [(key, histogram.render("mongodb_command_duration_seconds", format_labels(collection=key[0], command=key[1])))
+                       for key, histogram in self.latency.items()]
+            errors = dict(self.errors)
+
+        lines = [
+            "# HELP mongodb_command_duration_seconds MongoDB command latency by collection and command.",
+            "# TYPE mongodb_command_duration_seconds histogram",
+        ]
+        for _, histogram_lines in latency:
+            lines.extend(histogram_lines)
+        lines.append("# HELP mongodb_command_errors_total Failed MongoDB commands by collection and command.")
+        lines.append("# TYPE mongodb_command_errors_total counter")
+        for (collection, command_name), count in errors.items():
+            lines.append(f"mongodb_command_errors_total{{{format_labels(collection=collection, command=command_name)}}} {count}")
+        return lines
+
+
+command_monitor = CommandMonitor()
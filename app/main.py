@@ -1,5 +1,10 @@
+import asyncio
 import datetime
-from fastapi import FastAPI
+from app import config  # noqa: F401  Loads .env before anything reads the environment
+from contextlib import asynccontextmanager
+from typing import Literal, Optional
+from fastapi import FastAPI, HTTPException, Query, Request
+from pymongo.errors import PyMongoError
 from pydantic import BaseModel
 from app.routes.blog import router as blog_router
 from app.routes.admin import router as admin_router
@@ -10,17 +15,64 @@ from app.routes.event import router as event_router
 from app.routes.announcement import router as announcement_router
 from app.routes.insight import router as insight_router
 from app.routes.system import router as system_router
-from app.routes.notifications import router as notification_router
+from app.routes.notifications import router as notification_router, manager as notification_manager
+from app.routes.upload import router as upload_router
+from app.routes.media import router as media_router
+from app.routes.batch import router as batch_router
+from app.routes.snapshot import router as snapshot_router
 from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.utils.metrics import registry as metrics_registry
+from app.utils.middleware import RequestPipeline
+from app.utils import circuit_breaker
+from app.db.monitoring import command_monitor
+from app.services.system_sampler import sampler as system_sampler
+from app.services.loop_monitor import LOOP_MONITOR, monitor as loop_monitor
+from app.services.load_shedder import shedder
+from app.services.snapshots import SNAPSHOTS, builder as snapshot_builder
+from app.routes.usage import (
+    usage_tracker, get_api_usage, get_api_usage_series, reset_api_usage, reset_all_api_usage,
+    flush_api_usage, run_usage_flusher, run_usage_rollups,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background tasks that run for the lifetime of each worker
+    notification_manager.start()
+    tasks = [
+        asyncio.create_task(run_usage_flusher()),
+        asyncio.create_task(run_usage_rollups()),
+        asyncio.create_task(system_sampler.run()),
+    ]
+    if LOOP_MONITOR != "off":
+        tasks.append(asyncio.create_task(loop_monitor.run()))
+    if SNAPSHOTS != "off":
+        tasks.append(asyncio.create_task(snapshot_builder.run()))
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await flush_api_usage(final=True)
+    await notification_manager.stop()
 
-load_dotenv()
+app = FastAPI(lifespan=lifespan)
 
-from app.routes.usage import track_api_usage, get_api_usage, reset_all_api_usage, api_usage
+# Per-request hooks run in one pure ASGI middleware; add new cross-cutting ones to this list.
+# Usage comes first so requests the shedder turns away are still counted.
+app.add_middleware(RequestPipeline, hooks=[usage_tracker, shedder])
+metrics_registry.register(command_monitor.render)
+metrics_registry.register(loop_monitor.render)
+metrics_registry.register(shedder.render)
+metrics_registry.register(circuit_breaker.render)
 
-app = FastAPI()
 
-app.middleware("http")(track_api_usage)
+# Queries cut short by the request's deadline, where the route didn't handle it
+@app.exception_handler(PyMongoError)
+async def handle_mongo_error(request: Request, exc: PyMongoError):
+    if exc.timeout:
+        return JSONResponse({"detail": "Database operation timed out"}, status_code=504)
+    raise exc
 
 
 class ResetUsageRequest(BaseModel):
@@ -30,19 +82,37 @@ class ResetUsageRequest(BaseModel):
 async def get_usage_data():
     return await get_api_usage()
 
+# Usage over time for the dashboard; defaults to hourly buckets for the last day
+@app.get("/api/usage/series")
+async def get_usage_series(
+    start: Optional[datetime.datetime] = None,
+    end: Optional[datetime.datetime] = None,
+    granularity: Literal["minute", "hour", "day"] = "hour",
+    endpoint: Optional[str] = Query(None, description="Route template, e.g. /api/blogs/{blog_id}"),
+):
+    # Times without an offset are taken as UTC, which is what the buckets are stored in
+    if end and end.tzinfo is None:
+        end = end.replace(tzinfo=datetime.timezone.utc)
+    if start and start.tzinfo is None:
+        start = start.replace(tzinfo=datetime.timezone.utc)
+    end = end or datetime.datetime.now(datetime.timezone.utc)
+    start = start or end - datetime.timedelta(days=1)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return await get_api_usage_series(start, end, granularity, endpoint)
+
 @app.post("/api/reset_usage")
-async def reset_api_usage(request: ResetUsageRequest):
-    endpoint = request.endpoint  # Get the endpoint from the request body
-    # Check if the endpoint has a non-default usage count (greater than 0)
-    if api_usage[endpoint] > 0:
-        api_usage[endpoint] = 0  # Reset the usage count for the endpoint
+async def reset_usage(request: ResetUsageRequest):
+    endpoint = request.endpoint  # Get the endpoint (route template) from the request body
+    # Check if the endpoint had a usage count to reset
+    if await reset_api_usage(endpoint):
         return {"message": f"Usage count for {endpoint} reset to 0"}
     return {"message": f"Endpoint {endpoint} not found or no usage recorded"}
 
 
 @app.post("/api/reset_all_usage")
 async def reset_all_usage():
-    reset_all_api_usage()  # Call the function to reset all usage counts
+    await reset_all_api_usage()  # Call the function to reset all usage counts
     return {"message": "All API usage counts have been reset"}
 
 app.add_middleware(
@@ -57,6 +127,11 @@ app.add_middleware(
 def root():
     return {"status": "ok"}
 
+# Prometheus text exposition of per-route request metrics
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 # Include all the routers
 app.include_router(blog_router, prefix="/api/blogs", tags=["blogs"])
 app.include_router(admin_router, prefix="/api/admin", tags=["admin"])
@@ -68,3 +143,7 @@ app.include_router(announcement_router, prefix="/api/announcements", tags=["anno
 app.include_router(insight_router, prefix="/api/insights", tags=["insights"])
 app.include_router(system_router, prefix="/api/system", tags=["system"])
 app.include_router(notification_router, prefix="/ws", tags=["notifications"])
+app.include_router(upload_router, prefix="/api/uploads", tags=["uploads"])
+app.include_router(media_router, prefix="/media", tags=["media"])
+app.include_router(batch_router, prefix="/api/batch", tags=["batch"])
+app.include_router(snapshot_router, prefix="/api/snapshots", tags=["snapshots"])
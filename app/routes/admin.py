@@ -1,19 +1,29 @@
 import datetime
 from datetime import timedelta, timezone, datetime
 from bson import ObjectId
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Request
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query, Request
 from app.db.connection import db
 from app.schemas.admin import AdminCreate, AdminLoginRequest
 from app.schemas.project import ProjectCreate, ProjectResponse, ProjectUpdate
 from app.crud.admin import create_admin, authenticate_admin, get_admin_by_email, get_message_by_id
 from app.auth import create_access_token, create_refresh_token, verify_refresh_token, verify_token
 from fastapi.security import OAuth2PasswordBearer
-from googleapiclient.errors import HttpError 
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
 import logging
 from app.utils.uptime import server_start_time
 from app.services.send_email import send_email
 from app.services.update_message_status import update_message_status
+from app.services import asset_gc
+from app.utils.deadlines import without_deadline
+from app.routes.notifications import manager as notification_manager
+from app.db.monitoring import command_monitor
+from app.services.loop_monitor import monitor as loop_monitor
+from app.services.load_shedder import shedder
+from app.utils import circuit_breaker
+from app.services.profiler import profiler
+from app.services import memory_profiler
+from app.services.system_sampler import sampler as system_sampler
 
 
 # Add logging to capture more details
@@ -79,7 +89,7 @@ async def respond_to_message(message_id: str, email_response: EmailResponse, bac
     # Send the email in the background
     try:
         background_tasks.add_task(
-            send_email,
+            without_deadline(send_email),
             {"email": recipient_email, "name": recipient_name},
             "email response",
             response_message
@@ -239,6 +249,10 @@ async def create_project(project: ProjectCreate, admin=Depends(get_current_admin
     project_dict["id"] = str(result.inserted_id)
 
     if result.acknowledged:
+        await notification_manager.broadcast(
+            {"message": f"Project created: {project.name}", "project_id": project_dict["id"], "action": "created"},
+            topic="projects",
+        )
         return ProjectResponse(**project_dict)
 
     raise HTTPException(status_code=500, detail="Failed to create project")
@@ -299,6 +313,10 @@ async def update_project(project_id: str, project: ProjectUpdate, admin=Depends(
         {"$set": update_data}
     )
     if result.modified_count == 1:
+        await notification_manager.broadcast(
+            {"message": "Project updated", "project_id": project_id, "action": "updated"},
+            topic="projects",
+        )
         return {"message": "Project updated successfully"}
     else:
         raise HTTPException(status_code=404, detail="Project not found or no changes made")
@@ -307,6 +325,10 @@ async def update_project(project_id: str, project: ProjectUpdate, admin=Depends(
 async def delete_project(project_id: str, admin=Depends(get_current_admin)):
     result = await db.projects_database.projects.delete_one({"_id": ObjectId(project_id)})
     if result.deleted_count == 1:
+        await notification_manager.broadcast(
+            {"message": "Project deleted", "project_id": project_id, "action": "deleted"},
+            topic="projects",
+        )
         return {"message": "Project deleted successfully"}
     else:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -320,3 +342,150 @@ async def get_projects(admin=Depends(get_current_admin)):
     return [ProjectResponse(**project) for project in projects]
 
 
+# Reconcile stored images with the documents that reference them
+# Runs in the background on this worker; poll GET /assets/gc for the report
+@router.post("/assets/gc", status_code=202)
+async def run_asset_gc(
+    dry_run: bool = Query(True),
+    grace_hours: float = Query(24, gt=0),
+    admin=Depends(get_current_admin),
+):
+    if asset_gc.is_running():
+        raise HTTPException(status_code=409, detail="Asset garbage collection is already running")
+    try:
+        asset_gc.start_collection(timedelta(hours=grace_hours), dry_run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"message": "Asset garbage collection started", "dry_run": dry_run}
+
+
+@router.get("/assets/gc")
+async def get_asset_gc_report(admin=Depends(get_current_admin)):
+    running = asset_gc.is_running()
+    if asset_gc.last_report is None and not running:
+        raise HTTPException(status_code=404, detail="Asset garbage collection has not run yet")
+    # The report is from the last finished run, so it is None while the first one is running
+    return {"running": running, "report": asset_gc.last_report}
+
+
+# Per-command latency and the recent slow-query log for this worker
+@router.get("/diagnostics/mongo")
+async def get_mongo_diagnostics(admin=Depends(get_current_admin)):
+    return command_monitor.summary()
+
+
+# Event-loop lag and the calls that blocked the loop longest on this worker
+@router.get("/diagnostics/loop")
+async def get_loop_diagnostics(limit: int = Query(20, gt=0, le=200), admin=Depends(get_current_admin)):
+    return loop_monitor.report(limit)
+
+
+# Load-shedding thresholds, current load and how many requests were turned away
+@router.get("/diagnostics/load")
+async def get_load_diagnostics(admin=Depends(get_current_admin)):
+    return shedder.stats()
+
+
+# State of the circuit breakers around Cloudinary, the email service and Google
+@router.get("/diagnostics/breakers")
+async def get_breaker_diagnostics(admin=Depends(get_current_admin)):
+    return circuit_breaker.report()
+
+
+class ProfilingSettings(BaseModel):
+    sample_rate: float = Field(..., ge=0, le=1)
+
+
+# Request profiling on this worker: sampled requests plus any sent with an X-Profile-Token header
+@router.get("/profiling")
+async def get_profiling(admin=Depends(get_current_admin)):
+    return profiler.report()
+
+
+@router.put("/profiling")
+async def update_profiling(settings: ProfilingSettings, admin=Depends(get_current_admin)):
+    profiler.sample_rate = settings.sample_rate
+    return {"message": "Profiling sample rate updated", "sample_rate": profiler.sample_rate}
+
+
+@router.delete("/profiling")
+async def clear_profiles(admin=Depends(get_current_admin)):
+    profiler.clear()
+    return {"message": "Profiles cleared"}
+
+
+# A short-lived token that makes the server profile any request sending it as X-Profile-Token
+@router.post("/profiling/token")
+async def create_profiling_token(minutes: int = Query(15, gt=0, le=60), admin=Depends(get_current_admin)):
+    # No "sub" claim, so the token can't be used to authenticate as the admin
+    token = create_access_token({"scope": "profile", "issued_by": admin.email}, timedelta(minutes=minutes))
+    return {"token": token, "header": "X-Profile-Token", "expires_in": minutes * 60}
+
+
+# Collapsed stacks for flamegraph.pl or speedscope
+@router.get("/profiling/profiles/{profile_id}", response_class=PlainTextResponse)
+async def download_profile(profile_id: str, admin=Depends(get_current_admin)):
+    profile = profiler.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(
+        profile.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.txt"'},
+    )
+
+
+# Memory diagnostics for this worker. Snapshots need tracemalloc started first;
+# object counts and snapshot diffs walk the whole heap, so expect a pause on large workers.
+@router.get("/diagnostics/memory")
+async def get_memory_diagnostics(admin=Depends(get_current_admin)):
+    return {
+        "rss_bytes": system_sampler.process.memory_info().rss,
+        "tracemalloc": memory_profiler.tracing_status(),
+        "containers": memory_profiler.container_sizes(),
+        "gc": memory_profiler.gc_stats(),
+        "snapshots": [memory_profiler.snapshot_summary(entry) for entry in memory_profiler.snapshots.values()],
+    }
+
+
+@router.post("/diagnostics/memory/tracemalloc/start")
+async def start_tracemalloc(frames: int = Query(1, gt=0, le=50), admin=Depends(get_current_admin)):
+    if not memory_profiler.start_tracing(frames):
+        raise HTTPException(status_code=409, detail="tracemalloc is already running")
+    return {"message": "tracemalloc started", "frames": frames}
+
+
+@router.post("/diagnostics/memory/tracemalloc/stop")
+async def stop_tracemalloc(admin=Depends(get_current_admin)):
+    if not memory_profiler.stop_tracing():
+        raise HTTPException(status_code=409, detail="tracemalloc is not running")
+    return {"message": "tracemalloc stopped; snapshots discarded"}
+
+
+@router.post("/diagnostics/memory/snapshots")
+async def take_memory_snapshot(label: str = Query(None), admin=Depends(get_current_admin)):
+    try:
+        return memory_profiler.take_snapshot(label)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+# Allocation growth since a snapshot, against another snapshot or the current heap
+@router.get("/diagnostics/memory/snapshots/{snapshot_id}/diff")
+async def diff_memory_snapshots(
+    snapshot_id: str,
+    against: str = Query(None, description="Later snapshot ID; defaults to a fresh snapshot"),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    limit: int = Query(25, gt=0, le=500),
+    admin=Depends(get_current_admin),
+):
+    for required in (snapshot_id, against):
+        if required and required not in memory_profiler.snapshots:
+            raise HTTPException(status_code=404, detail=f"Snapshot {required} not found")
+    if not against and not memory_profiler.tracing_status()["tracing"]:
+        raise HTTPException(status_code=409, detail="tracemalloc is not running")
+    return memory_profiler.diff_snapshots(snapshot_id, against, group_by, limit)
+
+
+@router.get("/diagnostics/memory/objects")
+async def get_object_counts(limit: int = Query(50, gt=0, le=500), admin=Depends(get_current_admin)):
+    return memory_profiler.object_counts(limit)
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, HTTPException, Query, UploadFile, Form, Path
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Form, Path
 from typing import List
-from cloudinary.uploader import upload as cloudinary_upload
+from app.utils.storage import parse_signed_uploads
 from app.crud.announcement import create_announcement, get_all_announcements, update_announcement, delete_announcement
 from app.schemas.announcement import AnnouncementSchema, AnnouncementResponseSchema
+from app.utils.idempotency import IdempotentRoute
 
-router = APIRouter()
+# Creates honour Idempotency-Key, so a retried POST doesn't insert a duplicate
+router = APIRouter(route_class=IdempotentRoute)
 
 # Create a new announcement
 @router.post("/", response_model=AnnouncementResponseSchema)
@@ -14,20 +16,13 @@ async def create_announcement_route(
     announcement_date: str = Form(...),
     tags: str = Form(...),
     link: str = Form(...),
-    files: List[UploadFile] = Form(...),
+    images: str = Form(...),  # JSON list of signed uploads from /api/uploads/signature
 ):
     # Parse and validate tags
     tags_list = [tag.strip() for tag in tags.split(",") if tag.strip()]
 
-    # Validate images and upload to Cloudinary
-    image_urls = []
-    for file in files:
-        if file.content_type.startswith("image/"):
-            result = cloudinary_upload(file.file)
-            image_url = result.get("secure_url")
-            image_urls.append(image_url)
-        else:
-            raise HTTPException(status_code=400, detail="Only image files are allowed")
+    # Verify the signed direct uploads to image storage
+    image_urls = parse_signed_uploads(images, "announcements")
 
     # Create announcement object
     announcement_data = AnnouncementSchema(
@@ -61,7 +56,7 @@ async def update_announcement_route(
     announcement_date: str = Form(None),
     tags: str = Form(None),
     link: str = Form(None),
-    files: List[UploadFile] = Form(None),
+    images: str = Form(None),
 ):
     # Fetch the current announcement data
     try:
@@ -84,16 +79,8 @@ async def update_announcement_route(
         updated_data["link"] = link
 
     # Handle images if provided
-    if files:
-        image_urls = []
-        for file in files:
-            if file.content_type.startswith("image/"):
-                result = cloudinary_upload(file.file)
-                image_url = result.get("secure_url")
-                image_urls.append(image_url)
-            else:
-                raise HTTPException(status_code=400, detail="Only image files are allowed")
-        updated_data["images"] = image_urls
+    if images:
+        updated_data["images"] = parse_signed_uploads(images, "announcements")
 
     try:
         # Update announcement data in DB
@@ -103,11 +90,14 @@ async def update_announcement_route(
         raise HTTPException(status_code=500, detail=str(e))
 
 # Delete an announcement by its ID
-@router.delete("/{announcement_id}", response_model=AnnouncementResponseSchema)
-async def delete_announcement_route(announcement_id: str = Path(..., description="The ID of the announcement to be deleted")):
+@router.delete("/{announcement_id}", response_model=dict)
+async def delete_announcement_route(
+    background_tasks: BackgroundTasks,
+    announcement_id: str = Path(..., description="The ID of the announcement to be deleted"),
+):
     try:
         # Delete the announcement from DB
-        deleted_announcement = await delete_announcement(announcement_id)
+        deleted_announcement = await delete_announcement(announcement_id, background_tasks)
         return deleted_announcement
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
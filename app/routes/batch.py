@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from typing import List
+from urllib.parse import parse_qsl
+from fastapi import APIRouter, HTTPException
+from pydantic import TypeAdapter, ValidationError
+from pymongo.errors import PyMongoError
+from app.crud.announcement import get_all_announcements
+from app.crud.blog import get_all_blogs
+from app.crud.event import get_all_events
+from app.crud.insight import get_all_insights
+from app.crud.service import get_services
+from app.schemas.announcement import AnnouncementResponseSchema
+from app.schemas.batch import BatchItem, BatchRequest, BatchResponse, NoParams, PageParams
+from app.schemas.blog import BlogResponseSchema
+from app.schemas.event import EventResponseSchema
+from app.schemas.insight import InsightsResponseSchema
+from app.schemas.service import ServiceResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+class BatchEndpoint:
+    # A public GET that may be fetched in a batch, served straight from its crud function
+    def __init__(self, params_model, fetch, response_model):
+        self.params_model = params_model
+        self.fetch = fetch
+        self.adapter = TypeAdapter(response_model)
+
+
+# Only these reads may be batched, keyed by the path of the GET route they mirror
+BATCH_ENDPOINTS = {
+    "/api/services/": BatchEndpoint(NoParams, lambda params: get_services(), List[ServiceResponse]),
+    "/api/blogs/": BatchEndpoint(
+        PageParams, lambda params: get_all_blogs(params.limit, params.skip), List[BlogResponseSchema]),
+    "/api/events/": BatchEndpoint(
+        PageParams, lambda params: get_all_events(params.limit, params.skip), List[EventResponseSchema]),
+    "/api/insights/": BatchEndpoint(
+        PageParams, lambda params: get_all_insights(params.limit, params.skip), List[InsightsResponseSchema]),
+    "/api/announcements/": BatchEndpoint(
+        PageParams, lambda params: get_all_announcements(params.limit, params.skip), List[AnnouncementResponseSchema]),
+}
+
+
+async def run_item(item: BatchItem):
+    path, _, query = item.path.partition("?")
+    path = path.rstrip("/") + "/"
+    result = {"id": item.id or item.path}
+    endpoint = BATCH_ENDPOINTS.get(path)
+    if endpoint is None:
+        return {**result, "status": 404, "body": {"detail": f"{path} can't be fetched in a batch"}}
+    try:
+        params = endpoint.params_model.model_validate({**dict(parse_qsl(query)), **item.params})
+    except ValidationError as e:
+        return {**result, "status": 422, "body": {"detail": e.errors(include_url=False, include_context=False)}}
+    try:
+        data = await endpoint.fetch(params)
+        return {**result, "status": 200, "body": endpoint.adapter.validate_python(data)}
+    except HTTPException as e:
+        return {**result, "status": e.status_code, "body": {"detail": e.detail}}
+    except Exception as e:
+        if isinstance(e, PyMongoError) and e.timeout:
+            return {**result, "status": 504, "body": {"detail": "Database operation timed out"}}
+        logger.error(f"Batch request for {path} failed: {str(e)}")
+        return {**result, "status": 500, "body": {"detail": str(e)}}
+
+
+# Several public reads in one round trip, e.g. everything the landing page needs.
+# Sub-requests run concurrently and each reports its own status, so one failing doesn't fail the rest.
+@router.post("", response_model=BatchResponse)
+async def batch(request: BatchRequest):
+    responses = await asyncio.gather(*(run_item(item) for item in request.requests))
+    return {"responses": responses}
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, HTTPException, Query, UploadFile, Form
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Form
 from typing import List
-from cloudinary.uploader import upload as cloudinary_upload
+from app.utils.storage import parse_signed_uploads
 from app.crud.blog import create_blog, get_all_blogs, update_blog, delete_blog
 from app.schemas.blog import BlogResponseSchema, BlogSchema
+from app.utils.idempotency import IdempotentRoute
 
-router = APIRouter()
+# Creates honour Idempotency-Key, so a retried POST doesn't insert a duplicate
+router = APIRouter(route_class=IdempotentRoute)
 
 @router.post("/", response_model=BlogResponseSchema)
 async def create_blog_route(
@@ -15,20 +17,13 @@ async def create_blog_route(
     tags: str = Form(...),
     status: str = Form(...),
     slug: str = Form(...),
-    files: List[UploadFile] = Form(...),
+    images: str = Form(...),  # JSON list of signed uploads from /api/uploads/signature
 ):
     # Parse and validate tags
     tags_list = [tag.strip() for tag in tags.split(",") if tag.strip()]
 
-    # Validate images and upload to Cloudinary
-    image_urls = []
-    for file in files:
-        if file.content_type.startswith("image/"):
-            result = cloudinary_upload(file.file)
-            image_url = result.get("secure_url")
-            image_urls.append(image_url)
-        else:
-            raise HTTPException(status_code=400, detail="Only image files are allowed")
+    # Verify the signed direct uploads to image storage
+    image_urls = parse_signed_uploads(images, "blogs")
 
     # Create blog object
     blog_data = BlogSchema(
@@ -66,20 +61,13 @@ async def update_blog_route(
     tags: str = Form(...),
     status: str = Form(...),
     slug: str = Form(...),
-    files: List[UploadFile] = Form(...),
+    images: str = Form(...),  # JSON list of signed uploads from /api/uploads/signature
 ):
     # Parse and validate tags
     tags_list = [tag.strip() for tag in tags.split(",") if tag.strip()]
 
-    # Validate images and upload to Cloudinary
-    image_urls = []
-    for file in files:
-        if file.content_type.startswith("image/"):
-            result = cloudinary_upload(file.file)
-            image_url = result.get("secure_url")
-            image_urls.append(image_url)
-        else:
-            raise HTTPException(status_code=400, detail="Only image files are allowed")
+    # Verify the signed direct uploads to image storage
+    image_urls = parse_signed_uploads(images, "blogs")
 
     # Create blog object
     updated_blog_data = BlogSchema(
@@ -99,9 +87,9 @@ async def update_blog_route(
 
 
 @router.delete("/{blog_id}", response_model=dict)
-async def delete_blog_route(blog_id: str):
+async def delete_blog_route(blog_id: str, background_tasks: BackgroundTasks):
     try:
-        delete_response = await delete_blog(blog_id)
+        delete_response = await delete_blog(blog_id, background_tasks)
         return delete_response
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -1,11 +1,13 @@
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Query, UploadFile, Form
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Form
 from typing import List
-from cloudinary.uploader import upload as cloudinary_upload
+from app.utils.storage import parse_signed_uploads
 from app.crud.event import create_event, get_all_events, update_event, delete_event, get_event_by_id
 from app.schemas.event import EventSchema, EventResponseSchema
+from app.utils.idempotency import IdempotentRoute
 
-router = APIRouter()
+# Creates honour Idempotency-Key, so a retried POST doesn't insert a duplicate
+router = APIRouter(route_class=IdempotentRoute)
 
 @router.post("/", response_model=EventResponseSchema)
 async def create_event_route(
@@ -13,7 +15,7 @@ async def create_event_route(
     event_date: str = Form(...),  # Ensure this is formatted as a string (e.g., "2024-12-13T00:00:00")
     event_location: str = Form(...),
     event_description: str = Form(...),
-    files: List[UploadFile] = Form(...),
+    images: str = Form(...),  # JSON list of signed uploads from /api/uploads/signature
     event_link: str = Form(...),
 ):
     # Validate event_date format
@@ -22,14 +24,8 @@ async def create_event_route(
     except ValueError:
         raise HTTPException(status_code=422, detail="Invalid date format")
 
-    image_urls = []
-    for file in files:
-        if file.content_type.startswith("image/"):
-            result = cloudinary_upload(file.file)
-            image_url = result.get("secure_url")
-            image_urls.append(image_url)
-        else:
-            raise HTTPException(status_code=400, detail="Only image files are allowed")
+    # Verify the signed direct uploads to image storage
+    image_urls = parse_signed_uploads(images, "events")
 
     event_data = EventSchema(
         event_name=event_name,
@@ -69,7 +65,7 @@ async def update_event_route(
     event_date: str = Form(...),
     event_location: str = Form(...),
     event_description: str = Form(...),
-    files: List[UploadFile] = Form(...),
+    images: str = Form(...),  # JSON list of signed uploads from /api/uploads/signature
     event_link: str = Form(...),
 ):
     # Validate event_date format
@@ -78,14 +74,8 @@ async def update_event_route(
     except ValueError:
         raise HTTPException(status_code=422, detail="Invalid date format")
 
-    image_urls = []
-    for file in files:
-        if file.content_type.startswith("image/"):
-            result = cloudinary_upload(file.file)
-            image_url = result.get("secure_url")
-            image_urls.append(image_url)
-        else:
-            raise HTTPException(status_code=400, detail="Only image files are allowed")
+    # Verify the signed direct uploads to image storage
+    image_urls = parse_signed_uploads(images, "events")
 
     updated_data = EventSchema(
         event_name=event_name,
@@ -104,10 +94,10 @@ async def update_event_route(
 
 
 @router.delete("/{event_id}", response_model=dict)
-async def delete_event_route(event_id: str):
+async def delete_event_route(event_id: str, background_tasks: BackgroundTasks):
     
     try:
-        response = await delete_event(event_id)
+        response = await delete_event(event_id, background_tasks)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
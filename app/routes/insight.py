@@ -1,10 +1,12 @@
-from fastapi import APIRouter, HTTPException, Query, UploadFile, Form
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Form
 from typing import List
-from cloudinary.uploader import upload as cloudinary_upload
+from app.utils.storage import parse_signed_uploads
 from app.crud.insight import create_insight, get_all_insights, update_insight, delete_insight
 from app.schemas.insight import InsightsSchema, InsightsResponseSchema
+from app.utils.idempotency import IdempotentRoute
 
-router = APIRouter()
+# Creates honour Idempotency-Key, so a retried POST doesn't insert a duplicate
+router = APIRouter(route_class=IdempotentRoute)
 
 @router.post("/", response_model=InsightsResponseSchema)
 async def create_insight_route(
@@ -12,18 +14,11 @@ async def create_insight_route(
     insight_date: str = Form(...),
     insight_content: str = Form(...),
     author: str = Form(...),
-    files: List[UploadFile] = Form(...),
+    images: str = Form(...),  # JSON list of signed uploads from /api/uploads/signature
     insight_link: str = Form(...),
 ):
-    # Validate images and upload to Cloudinary
-    image_urls = []
-    for file in files:
-        if file.content_type.startswith("image/"):
-            result = cloudinary_upload(file.file)
-            image_url = result.get("secure_url")
-            image_urls.append(image_url)
-        else:
-            raise HTTPException(status_code=400, detail="Only image files are allowed")
+    # Verify the signed direct uploads to image storage
+    image_urls = parse_signed_uploads(images, "insights")
 
     # Create insight object
     insight_data = InsightsSchema(
@@ -56,19 +51,12 @@ async def update_insight_route(
     insight_date: str = Form(...),
     insight_content: str = Form(...),
     author: str = Form(...),
-    files: List[UploadFile] = Form(...),
+    images: str = Form(...),  # JSON list of signed uploads from /api/uploads/signature
     insight_link: str = Form(...),
 ):
     try:
-        # Validate images and upload to Cloudinary
-        image_urls = []
-        for file in files:
-            if file.content_type.startswith("image/"):
-                result = cloudinary_upload(file.file)
-                image_url = result.get("secure_url")
-                image_urls.append(image_url)
-            else:
-                raise HTTPException(status_code=400, detail="Only image files are allowed")
+        # Verify the signed direct uploads to image storage
+        image_urls = parse_signed_uploads(images, "insights")
 
         # Create the updated insight data
         updated_data = InsightsSchema(
@@ -89,9 +77,9 @@ async def update_insight_route(
 
 
 @router.delete("/{insight_id}")
-async def delete_insight_route(insight_id: str):
+async def delete_insight_route(insight_id: str, background_tasks: BackgroundTasks):
     try:
         # Delete the insight from the database
-        return await delete_insight(insight_id)
+        return await delete_insight(insight_id, background_tasks)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting insight: {str(e)}")
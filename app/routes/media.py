@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Form, HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+from app.utils.local_storage import LocalStorage, MediaFileResponse
+from app.utils.storage import get_storage
+
+router = APIRouter()
+
+# These routes stand in for Cloudinary when MEDIA_STORAGE=local
+def get_local_storage() -> LocalStorage:
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        raise HTTPException(status_code=404, detail="Local media storage is not enabled")
+    return storage
+
+
+# Direct upload target handed out by /api/uploads/signature, same form fields as Cloudinary
+@router.post("/image/upload")
+async def upload_media(
+    file: UploadFile,
+    api_key: str = Form(...),
+    timestamp: int = Form(...),
+    folder: str = Form(...),
+    allowed_formats: str = Form(...),
+    signature: str = Form(...),
+):
+    storage = get_local_storage()
+    storage.verify_upload_request(timestamp, folder, allowed_formats, signature)
+
+    extension = (file.filename or "").rsplit(".", 1)[-1].lower()
+    if not (file.content_type or "").startswith("image/") or extension not in allowed_formats.split(","):
+        raise HTTPException(status_code=400, detail="Only image files are allowed")
+
+    return await run_in_threadpool(storage.save, file.file, folder, extension)
+
+
+@router.get("/image/upload/{path:path}")
+async def serve_media(path: str):
+    file_path = get_local_storage().resolve(path)
+    if not file_path:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    # Versioned URLs never change, so they can be cached indefinitely
+    return MediaFileResponse(file_path, headers={"Cache-Control": "public, max-age=31536000, immutable"})
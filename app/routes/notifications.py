@@ -1,37 +1,306 @@
+import asyncio
 import json
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import List
+import logging
+import os
+from collections import deque
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.security import OAuth2PasswordBearer
+from typing import Dict, Optional, Set
+from app.auth import verify_token
+from app.services.notification_bus import NotificationBus, create_notification_bus
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/admin/login")
+
+# Frames a socket may fall behind by before it is dropped as a slow consumer
+SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "100"))
+# Longest a single send may take before the socket is considered dead
+SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "5"))
+# Recent events kept for reconnecting clients to catch up from
+REPLAY_BUFFER_SIZE = int(os.getenv("WS_REPLAY_BUFFER_SIZE", "1000"))
+# Upper bound on the coalescing window a client may ask for
+MAX_BATCH_WINDOW_MS = 1000
+
+# Broadcast topics a client can filter on
+TOPICS = {"messages", "projects", "system"}
+ADMIN_ROLES = {"admin", "superadmin"}
+
+
+# Same admin check as the socket itself
+async def get_current_admin(token: str = Depends(oauth2_scheme)):
+    payload = verify_token(token)
+    if not payload or payload.get("role") not in ADMIN_ROLES:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    return payload
+
+
+def _parse_list(value: Optional[str]) -> Optional[Set[str]]:
+    if not value:
+        return None
+    return {item.strip() for item in value.split(",") if item.strip()}
+
+
+class Connection:
+    def __init__(self, websocket: WebSocket, queue_size: int, topics=None, categories=None, batch_window: float = 0):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer: asyncio.Task = None
+        # None means everything; categories only narrow the "messages" topic
+        self.topics: Optional[Set[str]] = topics
+        self.categories: Optional[Set[str]] = categories
+        # Seconds to wait for more events before sending a combined frame
+        self.batch_window = batch_window
+
+    def wants(self, topic: str, category: Optional[str]):
+        if self.topics is not None and topic not in self.topics:
+            return False
+        if topic == "messages" and self.categories is not None and category not in self.categories:
+            return False
+        return True
+
+    def update_filters(self, request: dict):
+        if "topics" in request:
+            self.topics = set(request["topics"]) if isinstance(request["topics"], list) else None
+        if "categories" in request:
+            self.categories = set(request["categories"]) if isinstance(request["categories"], list) else None
+
+
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    def __init__(self, bus: NotificationBus, queue_size: int = SEND_QUEUE_SIZE, replay_size: int = REPLAY_BUFFER_SIZE):
+        self.bus = bus
+        self.queue_size = queue_size
+        self.subscriber: asyncio.Task = None
+        # (event_id, topic, category, frame) of recent events; every event after replay_floor is in here
+        self.history = deque(maxlen=replay_size)
+        self.replay_floor: Optional[int] = None
+        self.replays = 0
+        self.resyncs = 0
+        self.active_connections: Dict[WebSocket, Connection] = {}
+        self.dropped_frames = 0
+        self.evicted_connections = 0
+        # Strong references to in-flight close tasks so they aren't garbage collected
+        self._closing = set()
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(
+        self, websocket: WebSocket, connection: Connection, last_event_id: Optional[str] = None, epoch: Optional[str] = None
+    ):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        connection.writer = asyncio.create_task(self._write(connection))
+
+        # No awaits from here on, so no event can slip in between replay and registration
+        if last_event_id is not None:
+            self._resume(connection, last_event_id, epoch)
+        self.active_connections[websocket] = connection
+
+    def _resume(self, connection: Connection, last_event_id: str, epoch: Optional[str] = None):
+        """
+        Replay the events a reconnecting client missed, or tell it to resync
+        when they are no longer all in the buffer or its ID came from another
+        epoch. An empty last_event_id just reports the current position.
+        """
+        if last_event_id:
+            try:
+                missed = self.missed_since(connection, int(last_event_id), epoch)
+            except ValueError:
+                missed = None
+
+            if missed is None or len(missed) > self.queue_size - 1:
+                self.resyncs += 1
+                connection.queue.put_nowait(json.dumps({"type": "resync"}))
+            else:
+                self.replays += 1
+                for frame in missed:
+                    connection.queue.put_nowait(frame)
+
+        connection.queue.put_nowait(
+            json.dumps({"type": "ready", "event_id": self.latest_event_id(), "epoch": self.bus.epoch}))
+
+    def missed_since(self, connection: Connection, last_event_id: int, epoch: Optional[str] = None):
+        """
+        The frames after last_event_id this connection wants, or None when they
+        can't all be replayed: overrun, published before this worker started,
+        or numbered by another process or a restarted bus. Those IDs show up
+        as a different epoch or as an ID past the newest one seen here.
+        """
+        if self.replay_floor is None or last_event_id < self.replay_floor:
+            return None
+        if last_event_id > self.latest_event_id() or (epoch is not None and epoch != self.bus.epoch):
+            return None
+        return [
+            frame
+            for event_id, topic, category, frame in self.history
+            if event_id > last_event_id and connection.wants(topic, category)
+        ]
+
+    def latest_event_id(self):
+        if self.history:
+            return self.history[-1][0]
+        return self.replay_floor
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        connection = self.active_connections.pop(websocket, None)
+        if connection and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+
+    async def _write(self, connection: Connection):
+        # Each socket drains its own queue, so a slow one only holds up itself
+        try:
+            while True:
+                frame = await connection.queue.get()
+                if connection.batch_window:
+                    frame = await self._coalesce(connection, frame)
+                await asyncio.wait_for(connection.websocket.send_text(frame), SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"Dropping notification socket after failed send: {e!r}")
+            self._evict(connection)
+
+    async def _coalesce(self, connection: Connection, frame: str):
+        # Give a burst time to arrive, then send everything queued as one JSON array
+        await asyncio.sleep(connection.batch_window)
+        frames = [frame]
+        while not connection.queue.empty():
+            frames.append(connection.queue.get_nowait())
+        return "[" + ",".join(frames) + "]"
+
+    def _evict(self, connection: Connection):
+        if connection.websocket not in self.active_connections:
+            return
+        self.evicted_connections += 1
+        self.disconnect(connection.websocket)
+        task = asyncio.create_task(self._close(connection.websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            # 1013: try again later; the client reconnects and catches up
+            await asyncio.wait_for(websocket.close(code=1013), SEND_TIMEOUT)
+        except Exception:
+            pass
+
+    def _enqueue(self, connection: Connection, frame: str):
+        try:
+            connection.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.dropped_frames += 1
+            self._evict(connection)
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
+        connection = self.active_connections.get(websocket)
+        if connection:
+            self._enqueue(connection, message)
+
+    async def broadcast(self, message: dict, topic: str = "messages"):
+        # Publish to every worker; each one fans out to its own sockets
+        try:
+            await self.bus.publish({**message, "topic": topic})
+        except Exception as e:
+            logger.error(f"Failed to publish notification: {str(e)}")
+
+    async def fan_out(self, event_id: int, message: dict):
+        # Serialize once and enqueue without waiting on any socket
+        message_json = json.dumps({**message, "event_id": event_id})
+        topic = message.get("topic", "messages")
+        category = message.get("category")
 
-    async def broadcast(self, message: dict):
-        message_json = json.dumps(message)
-        for connection in self.active_connections:
-            await connection.send_text(message_json)
+        if len(self.history) == self.history.maxlen:
+            self.replay_floor = max(self.replay_floor or 0, self.history[0][0])
+        self.history.append((event_id, topic, category, message_json))
 
-manager = ConnectionManager()
+        for connection in list(self.active_connections.values()):
+            if connection.wants(topic, category):
+                self._enqueue(connection, message_json)
 
+    def _on_bus_start(self, latest_event_id: int):
+        # Events up to here were published before this worker was listening
+        if self.replay_floor is None:
+            self.replay_floor = latest_event_id
+
+    def start(self):
+        # One subscriber per worker
+        self.subscriber = asyncio.create_task(self.bus.subscribe(self.fan_out, self._on_bus_start))
+
+    async def stop(self):
+        if self.subscriber:
+            self.subscriber.cancel()
+            try:
+                await self.subscriber
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self):
+        depths = [connection.queue.qsize() for connection in self.active_connections.values()]
+        return {
+            "connections": len(depths),
+            "queue_size": self.queue_size,
+            "max_queue_depth": max(depths, default=0),
+            "total_queued": sum(depths),
+            "dropped_frames": self.dropped_frames,
+            "evicted_connections": self.evicted_connections,
+            "buffered_events": len(self.history),
+            "latest_event_id": self.latest_event_id(),
+            "epoch": self.bus.epoch,
+            "replays": self.replays,
+            "resyncs": self.resyncs,
+        }
+
+manager = ConnectionManager(create_notification_bus())
+
+# Admins connect with ?token=<access token>. Optional query parameters:
+#   topics=messages,projects   only these broadcast topics (default: all)
+#   categories=sales,support   only these contact-message categories
+#   batch_ms=50                coalesce events within this window into one JSON-array frame
+#   last_event_id=<id>         replay what was missed since the last frame seen
+#   epoch=<epoch>              the epoch from the last "ready" frame, so IDs from another
+#                              worker or a restart get a resync instead of a replay
+# Sending {"topics": [...], "categories": [...]} updates the filters; null clears one.
+# permessage-deflate is negotiated by the server when the client offers it (see app/worker.py).
 @router.websocket("/notifications")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_endpoint(
+    websocket: WebSocket,
+    token: Optional[str] = None,
+    topics: Optional[str] = None,
+    categories: Optional[str] = None,
+    batch_ms: int = 0,
+    last_event_id: Optional[str] = None,
+    epoch: Optional[str] = None,
+):
+    payload = verify_token(token) if token else None
+    if not payload or payload.get("role") not in ADMIN_ROLES:
+        # Closing before accept rejects the handshake
+        await websocket.close(code=1008)
+        return
+
+    connection = Connection(
+        websocket,
+        manager.queue_size,
+        topics=_parse_list(topics),
+        categories=_parse_list(categories),
+        batch_window=min(max(batch_ms, 0), MAX_BATCH_WINDOW_MS) / 1000,
+    )
+    await manager.connect(websocket, connection, last_event_id, epoch)
     try:
         while True:
-            data = await websocket.receive_text()
-            await manager.send_personal_message(f"You wrote: {data}", websocket)
+            try:
+                request = json.loads(await websocket.receive_text())
+            except ValueError:
+                continue
+            if isinstance(request, dict):
+                connection.update_filters(request)
     except WebSocketDisconnect:
+        # No presence event: in a reconnect storm it would fan out to every socket
+        # once per disconnect and push real events out of the replay history
+        pass
+    finally:
+        # Also covers sockets that fail or are evicted mid-receive
         manager.disconnect(websocket)
-        await manager.broadcast({"message": "A client disconnected"})
\ No newline at end of file
+
+
+@router.get("/notifications/stats")
+async def get_notification_stats(admin=Depends(get_current_admin)):
+    return manager.stats()
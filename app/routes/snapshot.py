@@ -0,0 +1,62 @@
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from app.services.snapshots import SNAPSHOTS, store
+from app.utils.local_storage import MediaFileResponse
+
+router = APIRouter()
+
+# Clients may keep a copy but must revalidate it, which costs a 304 while the content is unchanged
+SNAPSHOT_CACHE_CONTROL = "public, no-cache"
+
+
+def accepts_gzip(request: Request):
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            quality = params.strip()
+            try:
+                return not quality.startswith("q=") or float(quality[2:]) > 0
+            except ValueError:
+                return True
+    return False
+
+
+def etag_matches(request: Request, etag: str):
+    # If-None-Match is "*" or a list of ETags, compared weakly: W/ is ignored
+    for candidate in request.headers.get("if-none-match", "").split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+def serve_snapshot(request: Request, dataset: str, file_name: str):
+    resolved = store.resolve(dataset, file_name) if SNAPSHOTS != "off" else None
+    if resolved is None:
+        raise HTTPException(status_code=404, detail="Not in the snapshot")
+    path, etag, version = resolved
+
+    headers = {"Cache-Control": SNAPSHOT_CACHE_CONTROL, "Vary": "Accept-Encoding", "X-Snapshot-Version": version}
+    if accepts_gzip(request):
+        path = path.with_name(f"{path.name}.gz")
+        etag = f"{etag}-gzip"
+        headers["Content-Encoding"] = "gzip"
+    headers["ETag"] = f'"{etag}"'
+
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return MediaFileResponse(path, media_type="application/json", headers=headers)
+
+
+# Pre-rendered copies of the public list and detail routes, served from disk without querying
+# MongoDB. Lists past the snapshotted pages, and anything newer than the last rebuild, 404 here;
+# fall back to the live /api/<dataset>/ routes for those.
+@router.get("/{dataset}")
+async def get_snapshot_page(request: Request, dataset: str, page: int = Query(1, ge=1)):
+    return serve_snapshot(request, dataset, f"page-{page}.json")
+
+
+@router.get("/{dataset}/{item_id}")
+async def get_snapshot_item(request: Request, dataset: str, item_id: str):
+    return serve_snapshot(request, dataset, f"items/{item_id}.json")
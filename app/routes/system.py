@@ -1,25 +1,27 @@
-import psutil
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
+from app.services.system_sampler import sampler
 
 router = APIRouter()
 
 @router.get("/metrics")
 async def get_system_metrics():
-    # Get CPU usage
-    cpu_usage = psutil.cpu_percent(interval=1)
-
-    # Get memory usage
-    memory = psutil.virtual_memory()
-    memory_usage = memory.percent
-
-    # Get disk usage
-    disk = psutil.disk_usage('/')
-    disk_usage = disk.percent
+    # Latest background sample; never waits on psutil
+    sample = sampler.latest()
 
     # Return metrics in the same format as expected by the frontend
     metrics = [
-        {"name": "CPU Usage", "value": cpu_usage},
-        {"name": "Memory Usage", "value": memory_usage},
-        {"name": "Disk Space", "value": disk_usage},
+        {"name": "CPU Usage", "value": sample["cpu_percent"]},
+        {"name": "Memory Usage", "value": sample["memory_percent"]},
+        {"name": "Disk Space", "value": sample["disk_percent"]},
     ]
     return metrics
+
+
+# Full samples from the last `window` seconds, oldest first
+@router.get("/metrics/history")
+async def get_system_metrics_history(window: float = Query(300, gt=0)):
+    return {
+        "interval": sampler.interval,
+        "latest": sampler.latest(),
+        "samples": sampler.history(window),
+    }
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from app.schemas.upload import UploadSignatureRequest, UploadSignatureResponse
+from app.utils.storage import get_storage
+
+router = APIRouter()
+
+# Issue signed parameters for a direct browser-to-storage upload.
+# The resulting public_id/version/signature/secure_url are then sent to the
+# create and update routes instead of the image bytes.
+@router.post("/signature", response_model=UploadSignatureResponse)
+async def get_upload_signature(request: UploadSignatureRequest):
+    return get_storage().sign_upload(request.folder)
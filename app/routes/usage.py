@@ -1,23 +1,275 @@
+import asyncio
+import logging
+import os
+import time
 from collections import defaultdict
-from fastapi import Request
+from datetime import datetime, timedelta, timezone
 from fastapi.responses import JSONResponse
+from pymongo import UpdateOne
+from pymongo.errors import CollectionInvalid
+from app.db.connection import db
+from app.db.monitoring import request_scope
+from app.utils.metrics import HTTP_METHODS, registry
+from app.services.profiler import profiler
 
-# Store API usage counts
+logger = logging.getLogger(__name__)
+
+# Distinct endpoints counted per worker; anything past this goes into "other"
+MAX_TRACKED_ENDPOINTS = int(os.getenv("USAGE_MAX_ENDPOINTS", "500"))
+# Requests that matched no route (404s, scanner probes) are all counted here
+OTHER_ENDPOINT = "other"
+# Seconds between flushes of this worker's counts to Mongo
+FLUSH_INTERVAL = float(os.getenv("USAGE_FLUSH_INTERVAL", "10"))
+
+# Seconds between hourly/daily rollups of the per-minute series
+ROLLUP_INTERVAL = float(os.getenv("USAGE_ROLLUP_INTERVAL", "300"))
+# How long each resolution is kept; daily buckets are kept forever
+MINUTE_RETENTION_DAYS = int(os.getenv("USAGE_MINUTE_RETENTION_DAYS", "7"))
+HOUR_RETENTION_DAYS = int(os.getenv("USAGE_HOUR_RETENTION_DAYS", "90"))
+
+# Totals across all workers, one document per endpoint
+usage_collection = db.usage_database.api_usage
+# Per-minute buckets from every worker (a time-series collection), and their rollups
+usage_minutes_collection = db.usage_database.api_usage_minutes
+usage_series_collections = {
+    "minute": usage_minutes_collection,
+    "hour": db.usage_database.api_usage_hourly,
+    "day": db.usage_database.api_usage_daily,
+}
+# How far each rollup has got, so a run after downtime catches up on the buckets it missed
+rollup_state_collection = db.usage_database.usage_rollup_state
+series_ready = False
+
+# Calls counted on this worker since the last flush
 api_usage = defaultdict(int)
+# (minute, endpoint) -> [calls, errors, latency sum in seconds] since the last flush
+usage_minutes = defaultdict(lambda: [0, 0, 0.0])
+
+
+def endpoint_for(scope: dict):
+    # The matched route's template, e.g. /api/blogs/{blog_id}, not the raw path
+    route = scope.get("route")
+    return getattr(route, "path", None) or OTHER_ENDPOINT
+
+
+class UsageTracker:
+    """
+    Request hook (see app.utils.middleware.RequestPipeline) that counts
+    usage and records per-route latency, and profiles sampled requests.
+    """
+
+    def start(self, scope: dict):
+        method = scope["method"] if scope["method"] in HTTP_METHODS else "OTHER"
+        registry.in_flight[method] += 1
+        # Lets the Mongo command monitor attribute queries to this request's route
+        request_scope.set(scope)
+        profile = profiler.begin(scope) if profiler.should_profile(scope) else None
+        return method, profile
+
+    def finish(self, scope: dict, state, status: int, duration: float):
+        method, profile = state
+        registry.in_flight[method] -= 1
+
+        endpoint = endpoint_for(scope)
+        if endpoint not in api_usage and len(api_usage) >= MAX_TRACKED_ENDPOINTS:
+            endpoint = OTHER_ENDPOINT
+        if profile:
+            profiler.end(profile, endpoint, status)
+        api_usage[endpoint] += 1
+        bucket = usage_minutes[(int(time.time() // 60), endpoint)]
+        bucket[0] += 1
+        bucket[1] += status >= 500
+        bucket[2] += duration
+        registry.observe_request(endpoint, method, status, duration)
+
+
+usage_tracker = UsageTracker()
+
+
+async def flush_api_usage(final: bool = False):
+    await flush_usage_minutes(final)
+    if not api_usage:
+        return
+
+    pending = dict(api_usage)
+    api_usage.clear()
+    try:
+        await usage_collection.bulk_write(
+            [UpdateOne({"_id": endpoint}, {"$inc": {"calls": calls}}, upsert=True) for endpoint, calls in pending.items()],
+            ordered=False,
+        )
+    except Exception as e:
+        # Keep the counts for the next flush rather than losing them
+        for endpoint, calls in pending.items():
+            api_usage[endpoint] += calls
+        logger.error(f"Failed to flush API usage: {str(e)}")
+
+
+async def flush_usage_minutes(final: bool = False):
+    # Only finished minutes, so each worker writes one document per endpoint per minute
+    current_minute = int(time.time() // 60)
+    pending = {key: usage_minutes.pop(key) for key in list(usage_minutes) if final or key[0] < current_minute}
+    if not pending:
+        return
+
+    try:
+        # Before the first insert, which would otherwise create a plain collection
+        await ensure_usage_series()
+        await usage_minutes_collection.insert_many(
+            [
+                {
+                    "timestamp": datetime.fromtimestamp(minute * 60, timezone.utc),
+                    "endpoint": endpoint,
+                    "calls": calls,
+                    "errors": errors,
+                    "latency_sum": latency_sum,
+                }
+                for (minute, endpoint), (calls, errors, latency_sum) in pending.items()
+            ],
+            ordered=False,
+        )
+    except Exception as e:
+        for key, (calls, errors, latency_sum) in pending.items():
+            bucket = usage_minutes[key]
+            bucket[0] += calls
+            bucket[1] += errors
+            bucket[2] += latency_sum
+        logger.error(f"Failed to flush API usage series: {str(e)}")
+
+
+async def run_usage_flusher():
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL)
+        await flush_api_usage()
+
+
+async def setup_usage_series():
+    try:
+        await db.usage_database.create_collection(
+            usage_minutes_collection.name,
+            timeseries={"timeField": "timestamp", "metaField": "endpoint", "granularity": "minutes"},
+            expireAfterSeconds=MINUTE_RETENTION_DAYS * 86400,
+        )
+    except CollectionInvalid:
+        # Already exists; it only has the time-series options and TTL if it was created here
+        cursor = await db.usage_database.list_collections(filter={"name": usage_minutes_collection.name})
+        existing = await cursor.to_list(1)
+        if existing and existing[0].get("type") != "timeseries":
+            logger.warning(
+                f"{usage_minutes_collection.full_name} is not a time-series collection, so per-minute usage is "
+                f"never expired; drop it to have it recreated"
+            )
+    await usage_series_collections["hour"].create_index("timestamp", expireAfterSeconds=HOUR_RETENTION_DAYS * 86400)
+    await usage_series_collections["day"].create_index("timestamp")
+
+
+async def ensure_usage_series():
+    global series_ready
+    if not series_ready:
+        await setup_usage_series()
+        series_ready = True
+
+
+def _series_pipeline(match: dict, unit: str):
+    return [
+        {"$match": match},
+        {
+            "$group": {
+                "_id": {"endpoint": "$endpoint", "timestamp": {"$dateTrunc": {"date": "$timestamp", "unit": unit}}},
+                "calls": {"$sum": "$calls"},
+                "errors": {"$sum": "$errors"},
+                "latency_sum": {"$sum": "$latency_sum"},
+            }
+        },
+        {"$addFields": {"endpoint": "$_id.endpoint", "timestamp": "$_id.timestamp"}},
+    ]
+
+
+async def _rollup(source, unit: str, into: str, recent: datetime, floor: datetime):
+    """
+    Recompute the `unit` buckets of `into` from the last run's watermark, or
+    from `recent` if that is earlier, so buckets missed while no rollup ran
+    are filled in. Never from before `floor`: source buckets older than that
+    may be partly expired and would replace good rollups with smaller ones.
+    """
+    state = await rollup_state_collection.find_one({"_id": into})
+    since = recent
+    if state:
+        since = min(since, state["watermark"].replace(tzinfo=timezone.utc))
+    else:
+        since = floor
+    since = max(since, floor)
+
+    await source.aggregate(
+        _series_pipeline({"timestamp": {"$gte": since}}, unit)
+        + [{"$merge": {"into": into, "on": "_id", "whenMatched": "replace"}}]
+    ).to_list(length=None)
+    # Buckets from `recent` on can still change and are recomputed on every run
+    await rollup_state_collection.update_one({"_id": into}, {"$set": {"watermark": recent}}, upsert=True)
+
+
+async def rollup_api_usage():
+    now = datetime.now(timezone.utc)
+    this_hour = now.replace(minute=0, second=0, microsecond=0)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    await _rollup(
+        usage_minutes_collection, "hour", "api_usage_hourly",
+        recent=this_hour - timedelta(hours=2),
+        floor=this_hour - timedelta(days=MINUTE_RETENTION_DAYS) + timedelta(hours=1),
+    )
+    await _rollup(
+        usage_series_collections["hour"], "day", "api_usage_daily",
+        recent=today - timedelta(days=1),
+        floor=today - timedelta(days=HOUR_RETENTION_DAYS) + timedelta(days=1),
+    )
+
+
+async def run_usage_rollups():
+    while True:
+        try:
+            await ensure_usage_series()
+            await rollup_api_usage()
+        except Exception as e:
+            logger.error(f"Failed to roll up API usage: {str(e)}")
+        await asyncio.sleep(ROLLUP_INTERVAL)
+
+
+# Calls, errors and latency per endpoint per bucket between start and end
+async def get_api_usage_series(start: datetime, end: datetime, granularity: str, endpoint: str = None):
+    match = {"timestamp": {"$gte": start, "$lt": end}}
+    if endpoint:
+        match["endpoint"] = endpoint
+    pipeline = _series_pipeline(match, granularity) + [
+        {"$sort": {"timestamp": 1, "endpoint": 1}},
+        {"$project": {"_id": 0}},
+    ]
+    points = await usage_series_collections[granularity].aggregate(pipeline).to_list(length=None)
+    for point in points:
+        point["mean_latency_ms"] = round(point["latency_sum"] / point["calls"] * 1000, 2) if point["calls"] else 0
+    return points
 
-# Middleware to track API usage
-async def track_api_usage(request: Request, call_next):
-    endpoint = str(request.url.path)
-    api_usage[endpoint] += 1
-    response = await call_next(request)
-    return response
 
 # Endpoint to fetch the API usage data
 async def get_api_usage():
-    usage_data = [{"endpoint": endpoint, "calls": count} for endpoint, count in api_usage.items()]
+    totals = defaultdict(int)
+    async for document in usage_collection.find():
+        totals[document["_id"]] += document["calls"]
+    # Include this worker's unflushed counts
+    for endpoint, calls in api_usage.items():
+        totals[endpoint] += calls
+
+    usage_data = [{"endpoint": endpoint, "calls": count} for endpoint, count in totals.items()]
     return JSONResponse(content=usage_data)
 
+
+# Clear the usage count of one endpoint; returns whether it had any
+async def reset_api_usage(endpoint: str):
+    local_calls = api_usage.pop(endpoint, 0)
+    result = await usage_collection.delete_one({"_id": endpoint})
+    return local_calls > 0 or result.deleted_count > 0
+
+
 # Clear all API usage counts
-def reset_all_api_usage():
+async def reset_all_api_usage():
     api_usage.clear()  # Clear the usage data
-
+    await usage_collection.delete_many({})
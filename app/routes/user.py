@@ -1,28 +1,27 @@
-from google_auth_oauthlib.flow import Flow
-import google.auth.transport.requests
-import os
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, Response, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, Request, Response
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer
 from app.schemas.user import UserCreate, UserResponse, UserUpdate, UserLoginRequest, UserTokensResponse
-from app.auth import create_access_token, create_refresh_token, verify_google_token, verify_refresh_token, verify_token
+from app.auth import GOOGLE_TIMEOUT, create_access_token, create_refresh_token, google_breaker, verify_google_id_token, verify_google_token, verify_refresh_token, verify_token
 from app.crud.user import create_user, get_user_by_email, update_user, authenticate_user, get_user
 from app.db.connection import db
-from app.utils.cloudinary import upload as cloudinary_upload
-from app.utils.cloudinary import delete as cloudinary_delete
+from app.utils.storage import parse_signed_upload
+from app.utils.delete_images import delete_images
+from app.utils.circuit_breaker import CircuitOpenError
+from app.utils.deadlines import timeout_for
 from bson import ObjectId
-from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+from app.config import ENV, GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, GOOGLE_CLIENT_SECRETS, GOOGLE_REDIRECT_URI
 from app.utils.get_refresh import get_refresh_token_from_cookie
 
-load_dotenv()
 router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
-CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
-CLIENT_SECRETS = os.getenv("GOOGLE_CLIENT_SECRETS")
-REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI")
+CLIENT_ID = GOOGLE_CLIENT_ID
+CLIENT_SECRET = GOOGLE_CLIENT_SECRET
+CLIENT_SECRETS = GOOGLE_CLIENT_SECRETS
+REDIRECT_URI = GOOGLE_REDIRECT_URI
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     payload = verify_token(token)
@@ -38,7 +37,7 @@ async def register_user(
     email: str = Form(...),
     password: str = Form(...),
     phone: str = Form(None),
-    profile_picture: UploadFile = File(None),
+    profile_picture: str = Form(None),  # Signed upload from /api/uploads/signature
     bio: str = Form(None),
     is_active: bool = Form(True),
 ):
@@ -46,12 +45,8 @@ async def register_user(
     if existing_user:
         raise HTTPException(status_code=400, detail="User with this email already exists")
     if profile_picture:
-        if profile_picture.content_type.startswith("image/"):
-            result = cloudinary_upload(profile_picture.file)
-            image_url = result.get("secure_url")
-            profile_picture = image_url
-        else:
-            raise HTTPException(status_code=400, detail="Invalid profile picture format")
+        # Verify the signed direct upload to image storage
+        profile_picture = parse_signed_upload(profile_picture, "users")
 
     user_data = UserCreate(
         name=name,
@@ -89,11 +84,12 @@ async def get_user_profile(current_user: dict = Depends(get_current_user)):
 @router.put("/details/{user_id}", response_model=UserResponse)
 async def update_user_route(
     user_id: str,
+    background_tasks: BackgroundTasks,
     name: str = Form(None),
     email: str = Form(None),
     password: str = Form(None),
     phone: str = Form(None),
-    profile_picture: UploadFile = File(None),
+    profile_picture: str = Form(None),  # Signed upload from /api/uploads/signature
     bio: str = Form(None),
 ):
     # Fetch the existing user data
@@ -103,22 +99,12 @@ async def update_user_route(
     
     profile_picture_url = None
     if profile_picture:
-        if profile_picture.content_type.startswith("image/"):
-            if existing_user["profile_picture"]:
-                # Delete the existing profile picture from Cloudinary
-                try:
-                    cloudinary_delete(existing_user["profile_picture"].split("/")[-1].split(".")[0])
-                except Exception as e:
-                    raise HTTPException(status_code=500, detail=f"Error deleting profile picture: {str(e)}")
-            
-            result = cloudinary_upload(profile_picture.file)
-            profile_picture_url = result.get("secure_url")
-
-
-
-        else:
-            raise HTTPException(status_code=400, detail="Invalid profile picture format")
+        # Verify the signed direct upload before touching the existing picture
+        profile_picture_url = parse_signed_upload(profile_picture, "users")
 
+        if existing_user["profile_picture"]:
+            # Delete the existing profile picture from image storage once the response is sent
+            background_tasks.add_task(delete_images, [existing_user["profile_picture"]])
 
     # Update only the provided fields
     user_data = UserCreate(
@@ -136,7 +122,7 @@ async def update_user_route(
 async def login_user(email: str = Form(...), password: str = Form(...)):
     try:
         tokens = await authenticate_user(email, password)
-        is_production = os.getenv("ENV", "development") == "production"
+        is_production = ENV == "production"
 
         response = JSONResponse(content={
             "access_token": tokens["access_token"],
@@ -163,7 +149,7 @@ async def google_sign_up(token: str,  response: Response):
     try:
         # Verify Google token
         user_data = await verify_google_token(token)
-        is_production = os.getenv("ENV", "development") == "production"
+        is_production = ENV == "production"
 
         # Check if user already exists
         existing_user = await db.users_database.users.find_by_google_id(user_data["googleId"])
@@ -194,6 +180,9 @@ async def google_sign_up(token: str,  response: Response):
 
 
 def init_oauth_flow():
+    # google_auth_oauthlib pulls in requests and oauthlib; only the Google login routes need it
+    from google_auth_oauthlib.flow import Flow
+
     return Flow.from_client_secrets_file(
         CLIENT_SECRETS,  # Path to the downloaded Google client secrets file.
         scopes=[
@@ -218,20 +207,15 @@ async def google_login():
 async def google_callback(code: str):
     try:
         flow = init_oauth_flow()
-        flow.fetch_token(code=code)  # Simplified token fetch
+        with google_breaker.guard():
+            # Blocking HTTP call to Google's token endpoint, so off the event loop
+            await run_in_threadpool(flow.fetch_token, code=code, timeout=timeout_for(GOOGLE_TIMEOUT))
         
         # Get user info from ID token
         id_info = flow.credentials.id_token
         if not isinstance(id_info, dict):
             # If id_token is a string, decode it
-            from google.oauth2 import id_token
-            from google.auth.transport import requests
-            
-            id_info = id_token.verify_oauth2_token(
-                id_info,
-                requests.Request(),
-                CLIENT_ID
-            )
+            id_info = await verify_google_id_token(id_info)
         
         # Extract user info
         email = id_info.get("email")
@@ -272,11 +256,13 @@ async def google_callback(code: str):
         
         return response
 
+    except CircuitOpenError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Google OAuth Error: {str(e)}")
 
 @router.delete("/{user_id}", response_model=dict)
-async def delete_user_route(user_id: str):
+async def delete_user_route(user_id: str, background_tasks: BackgroundTasks):
     try:
         user_id = ObjectId(user_id)
     except Exception:
@@ -289,7 +275,7 @@ async def delete_user_route(user_id: str):
     result = await db.users_database.users.delete_one({"_id": user_id})
     
     if existing_user.get("profile_picture"):
-        cloudinary_delete(existing_user["profile_picture"].split("/")[-1].split(".")[0])
+        background_tasks.add_task(delete_images, [existing_user["profile_picture"]])
 
     if result.deleted_count == 1:
         return {"message": "User deleted successfully"}
@@ -0,0 +1,37 @@
+import os
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+
+# Most sub-requests one batch may carry
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+
+
+class BatchItem(BaseModel):
+    id: Optional[str] = None  # Echoed back so the client can match results; defaults to path
+    path: str  # e.g. "/api/blogs/" or "/api/blogs/?limit=3"
+    params: Dict[str, Any] = {}
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem] = Field(..., min_length=1, max_length=BATCH_MAX_REQUESTS)
+
+
+class BatchResult(BaseModel):
+    id: str
+    status: int
+    body: Any
+
+
+class BatchResponse(BaseModel):
+    responses: List[BatchResult]
+
+
+class PageParams(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    limit: int = 10
+    skip: int = Field(0, ge=0)
+
+
+class NoParams(BaseModel):
+    model_config = ConfigDict(extra="forbid")
@@ -0,0 +1,24 @@
+from pydantic import BaseModel, Field
+
+
+class UploadSignatureRequest(BaseModel):
+    folder: str = Field(..., pattern="^(blogs|events|insights|announcements|users)$")
+
+
+class UploadSignatureResponse(BaseModel):
+    upload_url: str
+    api_key: str
+    cloud_name: str
+    timestamp: int
+    folder: str
+    allowed_formats: str
+    signature: str
+
+
+# What the browser gets back from image storage after a signed upload
+class SignedUpload(BaseModel):
+    public_id: str
+    version: int
+    signature: str
+    secure_url: str
+
@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import contextvars
+import hashlib
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+from app.db.connection import db
+from app.utils.delete_images import DELETE_BATCH_SIZE, delete_public_ids, public_id_from_url
+from app.utils.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+# (collection, field) pairs that can reference a stored image; fields may be a URL or a list of URLs
+ASSET_REFERENCES = [
+    (db.blogs_database.blogs, "images"),
+    (db.events_database.events, "images"),
+    (db.insights_database.insights, "images"),
+    (db.announcements_database.announcements, "images"),
+    (db.services_database.services, "imageUrls"),
+    (db.users_database.users, "profile_picture"),
+]
+
+# Folders the GC may list and delete from, comma-separated, e.g. "blogs,events,insights,announcements,users".
+# Nothing outside them is ever touched; a GC that deletes refuses to run until this is set.
+ASSET_GC_FOLDERS = [folder.strip().strip("/") for folder in os.getenv("ASSET_GC_FOLDERS", "").split(",") if folder.strip()]
+# Folders this app uploads into (see UploadSignatureRequest); dry runs scan these when ASSET_GC_FOLDERS is unset
+UPLOAD_FOLDERS = ["blogs", "events", "insights", "announcements", "users"]
+
+CURSOR_BATCH_SIZE = 1000
+LISTING_PAGE_SIZE = 500
+REPORT_SAMPLE_SIZE = 50
+
+# Report of the most recent run, served by the admin route
+last_report: Optional[dict] = None
+gc_lock = asyncio.Lock()
+# Collection started by the admin route; runs on its own, outside the request that started it
+gc_task: Optional[asyncio.Task] = None
+
+
+def _fingerprint(public_id: str) -> int:
+    # 8-byte digest instead of the full public_id string keeps the live set small
+    return int.from_bytes(hashlib.blake2b(public_id.encode(), digest_size=8).digest(), "big")
+
+
+async def collect_live_public_ids() -> set:
+    live = set()
+    for collection, field in ASSET_REFERENCES:
+        # Stream only the referencing field so memory holds one batch at a time
+        cursor = collection.find({}, {field: 1, "_id": 0}).batch_size(CURSOR_BATCH_SIZE)
+        async for document in cursor:
+            urls = document.get(field)
+            for url in urls if isinstance(urls, list) else [urls]:
+                public_id = public_id_from_url(url) if isinstance(url, str) else None
+                if public_id:
+                    live.add(_fingerprint(public_id))
+    return live
+
+
+def gc_folders(dry_run: bool):
+    if ASSET_GC_FOLDERS:
+        return ASSET_GC_FOLDERS
+    if not dry_run:
+        raise ValueError("Set ASSET_GC_FOLDERS to the folders this app owns before deleting orphaned assets")
+    return UPLOAD_FOLDERS
+
+
+async def collect_orphaned_assets(grace_period: timedelta = timedelta(hours=24), dry_run: bool = True):
+    """
+    Delete stored images under the GC folders that no document references and
+    that are older than the grace period. With dry_run, only report what would
+    be deleted.
+    """
+    global last_report
+    async with gc_lock:
+        last_report = await _collect_orphaned_assets(grace_period, dry_run)
+    return last_report
+
+
+def is_running():
+    return gc_lock.locked() or (gc_task is not None and not gc_task.done())
+
+
+def start_collection(grace_period: timedelta, dry_run: bool):
+    """
+    Start a collection in the background, with no request deadline over it.
+    Raises ValueError if it may not run; progress is read from last_report.
+    """
+    global gc_task
+    gc_folders(dry_run)
+    # A fresh context, so nothing from the starting request (its deadline, its route) carries over
+    gc_task = asyncio.create_task(collect_orphaned_assets(grace_period, dry_run), context=contextvars.Context())
+    gc_task.add_done_callback(_record_failure)
+
+
+def _record_failure(task: asyncio.Task):
+    global last_report
+    if task.cancelled() or task.exception() is None:
+        return
+    logger.error(f"Asset GC failed: {task.exception()!r}")
+    last_report = {"failed": True, "error": str(task.exception()), "finished_at": datetime.now(timezone.utc).isoformat()}
+
+
+async def _collect_orphaned_assets(grace_period: timedelta, dry_run: bool):
+    folders = gc_folders(dry_run)
+    started_at = datetime.now(timezone.utc)
+    cutoff = started_at - grace_period
+
+    live = await collect_live_public_ids()
+    report = {
+        "dry_run": dry_run,
+        "started_at": started_at.isoformat(),
+        "grace_period_hours": grace_period.total_seconds() / 3600,
+        "folders": folders,
+        "live_references": len(live),
+        "scanned": 0,
+        "orphans": 0,
+        "deleted": 0,
+        "failed": 0,
+        "sample": [],
+    }
+
+    async def delete(public_ids):
+        deleted = await delete_public_ids(public_ids)
+        report["deleted"] += deleted
+        report["failed"] += len(public_ids) - deleted
+
+    # Page through each folder's listing, deleting each batch of orphans as it fills up
+    storage = get_storage()
+    pending = []
+    for folder in folders:
+        next_cursor = None
+        while True:
+            page = await run_in_threadpool(storage.list_assets, next_cursor, LISTING_PAGE_SIZE, f"{folder}/")
+            for resource in page.get("resources", []):
+                report["scanned"] += 1
+                created_at = datetime.fromisoformat(resource["created_at"].replace("Z", "+00:00"))
+                if created_at > cutoff or _fingerprint(resource["public_id"]) in live:
+                    continue
+
+                report["orphans"] += 1
+                if len(report["sample"]) < REPORT_SAMPLE_SIZE:
+                    report["sample"].append(resource["public_id"])
+                if not dry_run:
+                    pending.append(resource["public_id"])
+
+            if len(pending) >= DELETE_BATCH_SIZE:
+                await delete(pending)
+                pending = []
+
+            next_cursor = page.get("next_cursor")
+            if not next_cursor:
+                break
+
+    if pending:
+        await delete(pending)
+
+    report["finished_at"] = datetime.now(timezone.utc).isoformat()
+    logger.info(f"Asset GC finished: {report['orphans']} orphans out of {report['scanned']} assets, {report['deleted']} deleted, {report['failed']} failed")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete stored images that no document references")
+    parser.add_argument("--grace-hours", type=float, default=24)
+    parser.add_argument("--delete", action="store_true", help="Delete orphans instead of only reporting them")
+    args = parser.parse_args()
+    if args.delete and not ASSET_GC_FOLDERS:
+        parser.error("set ASSET_GC_FOLDERS to the folders this app owns before using --delete")
+
+    result = asyncio.run(collect_orphaned_assets(timedelta(hours=args.grace_hours), dry_run=not args.delete))
+    print(result)
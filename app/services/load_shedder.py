@@ -0,0 +1,72 @@
+import os
+from collections import Counter
+from fastapi import HTTPException
+from app.services.loop_monitor import monitor as loop_monitor
+from app.utils.metrics import format_labels
+
+# Requests this worker serves at once before turning new ones away with 503; 0 disables
+SHED_MAX_IN_FLIGHT = int(os.getenv("SHED_MAX_IN_FLIGHT", "256"))
+# Event-loop lag (seconds) past which new requests are turned away; 0 disables.
+# Needs the loop monitor (LOOP_MONITOR) running.
+SHED_LOOP_LAG = float(os.getenv("SHED_LOOP_LAG", "1.0"))
+# Seconds clients are told to wait before retrying
+SHED_RETRY_AFTER = os.getenv("SHED_RETRY_AFTER", "1")
+# Never shed health checks and metric scrapes, so an overloaded worker stays observable
+SHED_EXEMPT_PATHS = {"/", "/metrics"}
+
+
+class LoadShedder:
+    """
+    Request hook (see app.utils.middleware.RequestPipeline) that answers
+    503 straight away when the worker is already saturated, so admitted
+    requests keep finishing quickly instead of everything slowing down.
+    """
+
+    def __init__(self, max_in_flight: int = SHED_MAX_IN_FLIGHT, max_loop_lag: float = SHED_LOOP_LAG):
+        self.max_in_flight = max_in_flight
+        self.max_loop_lag = max_loop_lag
+        self.in_flight = 0
+        self.shed = Counter()
+
+    def overload_reason(self):
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return "in_flight"
+        if self.max_loop_lag and loop_monitor.last_lag >= self.max_loop_lag:
+            return "loop_lag"
+        return None
+
+    def start(self, scope: dict):
+        if scope["path"] not in SHED_EXEMPT_PATHS:
+            reason = self.overload_reason()
+            if reason:
+                self.shed[reason] += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Server is overloaded, please retry shortly",
+                    headers={"Retry-After": SHED_RETRY_AFTER},
+                )
+        self.in_flight += 1
+
+    def finish(self, scope: dict, state, status: int, duration: float):
+        self.in_flight -= 1
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "loop_lag_ms": round(loop_monitor.last_lag * 1000, 2),
+            "max_loop_lag_ms": self.max_loop_lag * 1000,
+            "shed": dict(self.shed),
+        }
+
+    def render(self):
+        lines = [
+            "# HELP http_requests_shed_total Requests turned away with 503 because the worker was overloaded.",
+            "# TYPE http_requests_shed_total counter",
+        ]
+        for reason in ("in_flight", "loop_lag"):
+            lines.append(f"http_requests_shed_total{{{format_labels(reason=reason)}}} {self.shed[reason]}")
+        return lines
+
+
+shedder = LoadShedder()
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from app.utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# "off" disables the monitor entirely
+LOOP_MONITOR = os.getenv("LOOP_MONITOR", "on")
+# Seconds between heartbeats; the watchdog thread checks on the same period
+HEARTBEAT_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.1"))
+# A heartbeat this late (seconds) counts as a stall
+STALL_THRESHOLD = float(os.getenv("LOOP_STALL_THRESHOLD", "0.1"))
+# Fraction of stalls whose stack is captured; every stall is still counted
+STALL_SAMPLE_RATE = float(os.getenv("LOOP_STALL_SAMPLE_RATE", "1.0"))
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Offenders tracked by location; the least costly are dropped past this
+MAX_OFFENDERS = 200
+# Frames kept per captured stack
+STACK_DEPTH = 30
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _route_of(frame):
+    # The Starlette route handler further up the await chain holds the request scope
+    while frame is not None:
+        scope = frame.f_locals.get("scope") if "scope" in frame.f_code.co_varnames else None
+        if isinstance(scope, dict) and scope.get("type") in ("http", "websocket"):
+            route = scope.get("route")
+            return getattr(route, "path", None) or scope.get("path")
+        frame = frame.f_back
+    return None
+
+
+def _blame(stack):
+    # The innermost frame in our own code, which is what needs fixing, else the innermost overall
+    for entry in reversed(stack):
+        if entry.filename.startswith(APP_ROOT):
+            return entry
+    return stack[-1] if stack else None
+
+
+class LoopMonitor:
+    """
+    Measures event-loop lag with a heartbeat coroutine. A watchdog thread
+    notices when the heartbeat is overdue and captures the loop thread's
+    stack while it is still blocked, so the report points at the call that
+    stalled the loop and the route it was serving.
+    """
+
+    def __init__(self, interval: float = HEARTBEAT_INTERVAL, threshold: float = STALL_THRESHOLD, sample_rate: float = STALL_SAMPLE_RATE):
+        self.interval = interval
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.lag = Histogram(LAG_BUCKETS)
+        self.max_lag = 0.0
+        # Lag of the most recent heartbeat, for load shedding
+        self.last_lag = 0.0
+        self.stalls = 0
+        # "file:line function" -> totals and the last stack seen there
+        self.offenders = {}
+        self.recent = deque(maxlen=50)
+        self.beat = None
+        self.loop_thread_id = None
+        # Set by the watchdog while the loop is blocked, picked up by the next heartbeat
+        self.capture = None
+        self.stopped = threading.Event()
+
+    async def run(self):
+        self.loop_thread_id = threading.get_ident()
+        self.stopped.clear()
+        watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        watchdog.start()
+        try:
+            while True:
+                self.beat = time.monotonic()
+                await asyncio.sleep(self.interval)
+                lag = max(time.monotonic() - self.beat - self.interval, 0.0)
+                self.lag.observe(lag)
+                self.last_lag = lag
+                self.max_lag = max(self.max_lag, lag)
+                if lag >= self.threshold:
+                    self._record_stall(lag)
+        finally:
+            self.stopped.set()
+
+    def _watch(self):
+        while not self.stopped.wait(self.interval):
+            beat = self.beat
+            if beat is None or (self.capture and self.capture["beat"] == beat):
+                continue
+            if time.monotonic() - beat - self.interval < self.threshold:
+                continue
+            if random.random() >= self.sample_rate:
+                # Mark this stall as seen without paying for a stack
+                self.capture = {"beat": beat, "stack": None, "route": None}
+                continue
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            self.capture = {
+                "beat": beat,
+                "stack": traceback.extract_stack(frame, limit=STACK_DEPTH),
+                "route": _route_of(frame),
+            }
+
+    def _record_stall(self, lag: float):
+        self.stalls += 1
+        capture, self.capture = self.capture, None
+        if not capture or capture["beat"] != self.beat or not capture["stack"]:
+            return
+
+        stack = capture["stack"]
+        frame = _blame(stack)
+        filename = os.path.relpath(frame.filename, os.path.dirname(APP_ROOT)) if frame.filename.startswith(APP_ROOT) else frame.filename
+        location = f"{filename}:{frame.lineno} {frame.name}"
+        stall = {
+            "at": time.time(),
+            "lag_ms": round(lag * 1000, 1),
+            "route": capture["route"],
+            "location": location,
+        }
+        self.recent.append(stall)
+        logger.warning(f"Event loop blocked for {stall['lag_ms']}ms at {location} (route {capture['route']})")
+
+        offender = self.offenders.get(location)
+        if offender is None:
+            if len(self.offenders) >= MAX_OFFENDERS:
+                del self.offenders[min(self.offenders, key=lambda key: self.offenders[key]["total_ms"])]
+            offender = self.offenders[location] = {"location": location, "count": 0, "total_ms": 0.0, "max_ms": 0.0, "routes": set()}
+        offender["count"] += 1
+        offender["total_ms"] += lag * 1000
+        offender["max_ms"] = max(offender["max_ms"], lag * 1000)
+        if capture["route"]:
+            offender["routes"].add(capture["route"])
+        offender["stack"] = traceback.format_list(stack)
+
+    def report(self, limit: int = 20):
+        offenders = sorted(self.offenders.values(), key=lambda item: item["total_ms"], reverse=True)[:limit]
+        return {
+            "enabled": self.loop_thread_id is not None,
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "sample_rate": self.sample_rate,
+            "heartbeats": self.lag.count,
+            "mean_lag_ms": round(self.lag.sum / self.lag.count * 1000, 2) if self.lag.count else 0,
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "stalls": self.stalls,
+            "worst_offenders": [
+                {**offender, "total_ms": round(offender["total_ms"], 1), "max_ms": round(offender["max_ms"], 1), "routes": sorted(offender["routes"])}
+                for offender in offenders
+            ],
+            "recent_stalls": list(reversed(self.recent)),
+        }
+
+    def render(self):
+        lines = [
+            "# HELP event_loop_lag_seconds How late the event loop ran a scheduled heartbeat.",
+            "# TYPE event_loop_lag_seconds histogram",
+        ]
+        lines.extend(self.lag.render("event_loop_lag_seconds", ""))
+        lines.append("# HELP event_loop_stalls_total Heartbeats later than the stall threshold.")
+        lines.append("# TYPE event_loop_stalls_total counter")
+        lines.append(f"event_loop_stalls_total {self.stalls}")
+        return lines
+
+
+monitor = LoopMonitor()
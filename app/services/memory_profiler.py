@@ -0,0 +1,136 @@
+import gc
+import os
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+
+# Snapshots kept per worker; the oldest is dropped past this
+MAX_SNAPSHOTS = int(os.getenv("MEMORY_MAX_SNAPSHOTS", "4"))
+
+# Allocations made by the profiler itself would otherwise dominate every diff
+SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+# id -> {"id", "label", "taken_at", "snapshot"}
+snapshots = OrderedDict()
+
+
+def start_tracing(frames: int = 1):
+    # More frames per allocation give better tracebacks but cost more memory and time
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(frames)
+    return True
+
+
+def stop_tracing():
+    # Stopping discards every trace, so saved snapshots are dropped with them
+    if not tracemalloc.is_tracing():
+        return False
+    tracemalloc.stop()
+    snapshots.clear()
+    return True
+
+
+def tracing_status():
+    if not tracemalloc.is_tracing():
+        return {"tracing": False}
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "tracing": True,
+        "frames": tracemalloc.get_traceback_limit(),
+        "traced_bytes": current,
+        "peak_traced_bytes": peak,
+        "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+    }
+
+
+def take_snapshot(label: str = None):
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is not running")
+    snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+    entry = {"id": uuid.uuid4().hex[:12], "label": label, "taken_at": time.time(), "snapshot": snapshot}
+    snapshots[entry["id"]] = entry
+    while len(snapshots) > MAX_SNAPSHOTS:
+        snapshots.popitem(last=False)
+    return snapshot_summary(entry)
+
+
+def snapshot_summary(entry: dict):
+    stats = entry["snapshot"].statistics("filename")
+    return {
+        "id": entry["id"],
+        "label": entry["label"],
+        "taken_at": entry["taken_at"],
+        "size_bytes": sum(stat.size for stat in stats),
+        "blocks": sum(stat.count for stat in stats),
+    }
+
+
+def _location(stat):
+    frame = stat.traceback[0]
+    return f"{frame.filename}:{frame.lineno}" if frame.lineno else frame.filename
+
+
+def diff_snapshots(base_id: str, target_id: str = None, group_by: str = "lineno", limit: int = 25):
+    """
+    Top allocation growth from the base snapshot to the target, or to a
+    fresh snapshot when no target is given.
+    """
+    base = snapshots[base_id]["snapshot"]
+    target = snapshots[target_id]["snapshot"] if target_id else tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+    differences = target.compare_to(base, group_by)
+    return [
+        {
+            "location": _location(stat),
+            "size_diff_bytes": stat.size_diff,
+            "size_bytes": stat.size,
+            "count_diff": stat.count_diff,
+            "count": stat.count,
+        }
+        for stat in differences[:limit]
+    ]
+
+
+def object_counts(limit: int = 50):
+    # Live instances of our own (app.*) classes, most numerous first
+    ours = Counter()
+    for obj in gc.get_objects():
+        module = getattr(type(obj), "__module__", "")
+        if module.startswith("app."):
+            ours[f"{module}.{type(obj).__qualname__}"] += 1
+    return [{"type": name, "count": count} for name, count in ours.most_common(limit)]
+
+
+def container_sizes():
+    # Structures that grow with traffic; each one should plateau
+    from app.routes.usage import api_usage, usage_minutes
+    from app.routes.notifications import manager
+    from app.db.monitoring import command_monitor
+    from app.utils.metrics import registry
+
+    return {
+        "api_usage": len(api_usage),
+        "usage_minutes": len(usage_minutes),
+        "metrics_latency_series": len(registry.latency),
+        "metrics_response_series": len(registry.responses),
+        "notification_connections": len(manager.active_connections),
+        "notification_history": len(manager.history),
+        "mongo_commands_pending": len(command_monitor.pending),
+        "mongo_command_series": len(command_monitor.latency),
+    }
+
+
+def gc_stats():
+    return {
+        "enabled": gc.isenabled(),
+        "thresholds": gc.get_threshold(),
+        "counts": gc.get_count(),
+        "generations": gc.get_stats(),
+        "uncollectable": len(gc.garbage),
+    }
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timezone
+
+from pymongo import CursorType, ReturnDocument
+from pymongo.errors import CollectionInvalid
+
+logger = logging.getLogger(__name__)
+
+# "memory" for a single worker, "mongo" or "redis" to fan out across workers
+NOTIFICATION_BUS = os.getenv("NOTIFICATION_BUS", "memory")
+
+# How long a subscriber waits before re-establishing a dead feed
+RETRY_DELAY = 1.0
+
+
+class NotificationBus(ABC):
+    """
+    Carries broadcast events between workers. Every worker publishes to the
+    bus and runs one subscriber that hands each event to its local sockets.
+    """
+
+    # Changes whenever event IDs start over, so an ID from another epoch can't be
+    # mistaken for one of these; empty for buses whose sequence is shared and persistent
+    epoch = ""
+
+    @abstractmethod
+    async def publish(self, message: dict):
+        """
+        Publish an event under the next ID of a sequence shared by all workers.
+        """
+
+    @abstractmethod
+    async def subscribe(self, handler, on_start=None):
+        """
+        Call on_start(latest_event_id) once the feed is positioned, then
+        handler(event_id, message) for every later event, forever.
+        """
+
+
+class InProcessBus(NotificationBus):
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.last_event_id = 0
+        # IDs are per process and restart at 0
+        self.epoch = uuid.uuid4().hex[:12]
+
+    async def publish(self, message: dict):
+        self.last_event_id += 1
+        self.queue.put_nowait((self.last_event_id, message))
+
+    async def subscribe(self, handler, on_start=None):
+        if on_start:
+            on_start(self.last_event_id - self.queue.qsize())
+        while True:
+            event_id, message = await self.queue.get()
+            await handler(event_id, message)
+
+
+class MongoCappedBus(NotificationBus):
+    """
+    Tails a capped collection. Events carry a sequence number from a counter
+    document so a subscriber can resume where it left off after its cursor dies.
+    """
+
+    # Events re-read on resume to catch ones inserted slightly out of sequence order
+    RESUME_OVERLAP = 100
+
+    def __init__(self, database, name: str = "events", size_bytes: int = 16 * 1024 * 1024):
+        self.database = database
+        self.name = name
+        self.size_bytes = size_bytes
+        self.collection = database[name]
+        self.counters = database["counters"]
+
+    async def setup(self):
+        try:
+            await self.database.create_collection(self.name, capped=True, size=self.size_bytes)
+        except CollectionInvalid:
+            pass  # Already exists
+
+    async def next_sequence(self):
+        counter = await self.counters.find_one_and_update(
+            {"_id": self.name},
+            {"$inc": {"seq": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return counter["seq"]
+
+    async def publish(self, message: dict):
+        seq = await self.next_sequence()
+        await self.collection.insert_one({"seq": seq, "message": message, "created_at": datetime.now(timezone.utc)})
+
+    async def subscribe(self, handler, on_start=None):
+        floor = last_seq = None
+        seen = deque(maxlen=self.RESUME_OVERLAP * 2)
+
+        while True:
+            try:
+                if floor is None:
+                    await self.setup()
+                    # Start after the newest event; older ones were delivered before this worker started
+                    newest = await self.collection.find_one(sort=[("$natural", -1)])
+                    floor = last_seq = newest["seq"] if newest else 0
+                    if on_start:
+                        on_start(floor)
+
+                query = {"seq": {"$gt": max(floor, last_seq - self.RESUME_OVERLAP)}}
+                cursor = self.collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for event in cursor:
+                        if event["seq"] in seen:
+                            continue
+                        seen.append(event["seq"])
+                        last_seq = max(last_seq, event["seq"])
+                        await handler(event["seq"], event["message"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if floor is None:
+                    logger.error(f"Notification feed setup failed, retrying: {str(e)}")
+                else:
+                    logger.error(f"Notification feed error, resuming after seq {last_seq}: {str(e)}")
+
+            # An empty capped collection or a dropped connection kills the cursor
+            await asyncio.sleep(RETRY_DELAY)
+
+
+class RedisBus(NotificationBus):
+    """
+    Uses a Redis stream, so subscribers resume from the last entry ID they
+    read instead of missing events published while they reconnect.
+    """
+
+    def __init__(self, url: str, stream: str = "notifications", max_length: int = 10000):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise ValueError("NOTIFICATION_BUS=redis requires the redis package") from e
+
+        self.redis = redis.from_url(url)
+        self.stream = stream
+        self.max_length = max_length
+
+    async def publish(self, message: dict):
+        event_id = await self.redis.incr(f"{self.stream}:event_id")
+        await self.redis.xadd(
+            self.stream,
+            {"event_id": event_id, "message": json.dumps(message)},
+            maxlen=self.max_length,
+            approximate=True,
+        )
+
+    async def subscribe(self, handler, on_start=None):
+        last_id = None
+
+        while True:
+            try:
+                if last_id is None:
+                    # Position on the newest entry so the reported event ID matches where reading starts
+                    newest = await self.redis.xrevrange(self.stream, count=1)
+                    last_id = newest[0][0] if newest else "0-0"
+                    if on_start:
+                        on_start(int(newest[0][1][b"event_id"]) if newest else 0)
+
+                response = await self.redis.xread({self.stream: last_id}, block=5000, count=100)
+                for _, entries in response or []:
+                    for entry_id, fields in entries:
+                        last_id = entry_id
+                        await handler(int(fields[b"event_id"]), json.loads(fields[b"message"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if last_id is None:
+                    logger.error(f"Notification stream setup failed, retrying: {str(e)}")
+                else:
+                    logger.error(f"Notification stream error, resuming after {last_id}: {str(e)}")
+                await asyncio.sleep(RETRY_DELAY)
+
+
+def create_notification_bus() -> NotificationBus:
+    if NOTIFICATION_BUS == "memory":
+        return InProcessBus()
+    if NOTIFICATION_BUS == "mongo":
+        from app.db.connection import db
+        return MongoCappedBus(db.notifications_database)
+    if NOTIFICATION_BUS == "redis":
+        return RedisBus(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    raise ValueError(f"Unknown NOTIFICATION_BUS backend: {NOTIFICATION_BUS}")
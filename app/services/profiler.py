@@ -0,0 +1,158 @@
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from starlette.datastructures import Headers
+from app.auth import verify_token
+
+# Fraction of requests profiled; 0 turns sampling off. Admins can change it at runtime.
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Seconds between stack samples while a profiled request is in flight
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+# Slowest profiles kept per route
+PROFILES_PER_ROUTE = int(os.getenv("PROFILES_PER_ROUTE", "5"))
+# Requests carrying a profiling token from /api/admin/profiling/token are always profiled
+PROFILE_HEADER = "x-profile-token"
+
+# Samples taken while the request was awaiting or another task held the loop
+NOT_RUNNING = "[not running]"
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def is_profile_token(token: str):
+    payload = verify_token(token)
+    return bool(payload) and payload.get("scope") == "profile"
+
+
+def _frame_name(frame):
+    filename = frame.f_code.co_filename
+    if filename.startswith(PROJECT_ROOT):
+        filename = os.path.relpath(filename, PROJECT_ROOT)
+    elif "site-packages" in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[-1]
+    return f"{frame.f_code.co_name} ({filename})"
+
+
+class Profile:
+    def __init__(self, scope: dict):
+        self.id = uuid.uuid4().hex
+        self.scope = scope
+        self.stacks = Counter()
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.route = None
+        self.status = None
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "route": self.route,
+            "method": self.scope.get("method"),
+            "path": self.scope.get("path"),
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 2),
+            "samples": sum(self.stacks.values()),
+        }
+
+    def collapsed(self):
+        # Brendan Gregg's collapsed-stack format, readable by flamegraph.pl and speedscope
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for individual requests. While a profiled request
+    is in flight a thread samples the event loop's stack and keeps the
+    part below that request's handler. When nothing is profiled the thread
+    isn't running and the middleware only does a rate check.
+    """
+
+    def __init__(self, sample_rate: float = PROFILE_SAMPLE_RATE, interval: float = PROFILE_INTERVAL, keep: int = PROFILES_PER_ROUTE):
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.keep = keep
+        self.lock = threading.Lock()
+        self.active = {}  # id -> Profile in flight
+        self.profiles = defaultdict(list)  # route -> slowest finished profiles
+        self.thread = None
+        self.loop_thread_id = None
+
+    def should_profile(self, scope: dict):
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        token = Headers(scope=scope).get(PROFILE_HEADER)
+        return bool(token) and is_profile_token(token)
+
+    def begin(self, scope: dict):
+        profile = Profile(scope)
+        self.loop_thread_id = threading.get_ident()
+        with self.lock:
+            self.active[profile.id] = profile
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+                self.thread.start()
+        return profile
+
+    def end(self, profile: Profile, route: str, status: int):
+        profile.duration = time.perf_counter() - profile.start
+        profile.route = route
+        profile.status = status
+        with self.lock:
+            self.active.pop(profile.id, None)
+            kept = self.profiles[route]
+            kept.append(profile)
+            kept.sort(key=lambda item: item.duration, reverse=True)
+            del kept[self.keep:]
+
+    def _sample(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.active:
+                    self.thread = None
+                    return
+                active = list(self.active.values())
+            frame = sys._current_frames().get(self.loop_thread_id)
+            for profile in active:
+                profile.stacks[self._stack_for(frame, profile.scope)] += 1
+
+    def _stack_for(self, frame, scope: dict):
+        # Frames from the innermost up to the route handler that owns this request's scope
+        names = []
+        while frame is not None:
+            names.append(_frame_name(frame))
+            if "scope" in frame.f_code.co_varnames and frame.f_locals.get("scope") is scope:
+                return ";".join(reversed(names))
+            frame = frame.f_back
+        return NOT_RUNNING
+
+    def get(self, profile_id: str):
+        with self.lock:
+            for kept in self.profiles.values():
+                for profile in kept:
+                    if profile.id == profile_id:
+                        return profile
+        return None
+
+    def report(self):
+        with self.lock:
+            routes = {route: [profile.summary() for profile in kept] for route, kept in self.profiles.items()}
+        return {
+            "sample_rate": self.sample_rate,
+            "interval_ms": self.interval * 1000,
+            "in_flight": len(self.active),
+            "routes": routes,
+        }
+
+    def clear(self):
+        with self.lock:
+            self.profiles.clear()
+
+
+profiler = SamplingProfiler()
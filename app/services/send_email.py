@@ -1,10 +1,27 @@
 import os
 from fastapi import HTTPException
-import requests
+from starlette.concurrency import run_in_threadpool
+from app.config import EMAIL_WEB_URL
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.deadlines import timeout_for
 
-EMAIL_API = os.getenv("EMAIL_WEB_URL")
+EMAIL_API = EMAIL_WEB_URL
+# Seconds to wait on the email service, less if the request's deadline is nearer
+EMAIL_TIMEOUT = float(os.getenv("EMAIL_TIMEOUT", "10"))
+
+
+def _is_outage(error: Exception):
+    # A 4xx means our request was wrong, not that the email service is down
+    response = getattr(error, "response", None)
+    return response is None or response.status_code >= 500
+
+
+email_breaker = CircuitBreaker("email", is_failure=_is_outage)
 
 async def send_email(user: dict, email_type: str, response_message: str = None):
+    # requests is only needed once an email is actually sent
+    import requests
+
     try:
         # Prepare the payload for the email request
         payload = {
@@ -19,8 +36,9 @@ async def send_email(user: dict, email_type: str, response_message: str = None):
                 raise HTTPException(status_code=400, detail="Response message is required for email response type.")
             payload["responseMessage"] = response_message
         
-        # Send the email request
-        response = requests.post(EMAIL_API, json=payload)
-        response.raise_for_status()
+        # Send the email request off the event loop; raises CircuitOpenError (a 503) while the service is down
+        with email_breaker.guard():
+            response = await run_in_threadpool(requests.post, EMAIL_API, json=payload, timeout=timeout_for(EMAIL_TIMEOUT))
+            response.raise_for_status()
     except requests.exceptions.RequestException as e:
         raise HTTPException(status_code=500, detail=f"Email sending failed: {str(e)}")
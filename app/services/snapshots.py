@@ -0,0 +1,327 @@
+import asyncio
+import functools
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+
+from pydantic import TypeAdapter
+from pymongo.errors import DuplicateKeyError
+from app.db.connection import db
+from app.schemas.announcement import AnnouncementResponseSchema
+from app.schemas.blog import BlogResponseSchema
+from app.schemas.event import EventResponseSchema
+from app.schemas.insight import InsightsResponseSchema
+from app.schemas.service import ServiceResponse
+
+logger = logging.getLogger(__name__)
+
+# "off" to stop building snapshots; the snapshot routes then answer 404
+SNAPSHOTS = os.getenv("SNAPSHOTS", "on")
+# Directory the snapshot files are written to; shared by the workers on one host
+SNAPSHOT_ROOT = Path(os.getenv("SNAPSHOT_ROOT", "snapshots")).resolve()
+# Names the copy of SNAPSHOT_ROOT this worker writes to: one worker per host builds each change
+SNAPSHOT_HOST = os.getenv("SNAPSHOT_HOST", socket.gethostname())
+# Pages of each paginated list that are snapshotted, at the list routes' default page size
+SNAPSHOT_PAGES = int(os.getenv("SNAPSHOT_PAGES", "5"))
+SNAPSHOT_PAGE_SIZE = 10
+# Seconds to wait after a write before rebuilding, so a burst of edits triggers one rebuild
+SNAPSHOT_DEBOUNCE = float(os.getenv("SNAPSHOT_DEBOUNCE", "1"))
+# Seconds between checks for writes made in other workers
+SNAPSHOT_POLL_INTERVAL = float(os.getenv("SNAPSHOT_POLL_INTERVAL", "5"))
+# Seconds between full rebuilds, which pick up writes made outside the API
+SNAPSHOT_REFRESH_INTERVAL = float(os.getenv("SNAPSHOT_REFRESH_INTERVAL", "300"))
+# Seconds a worker may hold a dataset's build before another worker takes it over
+SNAPSHOT_BUILD_LEASE = float(os.getenv("SNAPSHOT_BUILD_LEASE", "120"))
+# Old versions kept so a request that resolved one just before a switch can still send it
+SNAPSHOT_KEEP_VERSIONS = 3
+
+
+class Dataset:
+    # A public dataset and how to read all of it through its crud module
+    def __init__(self, name: str, fetch_all, schema, paginated: bool = True, items: bool = True):
+        self.name = name
+        self.fetch_all = fetch_all
+        self.list_adapter = TypeAdapter(List[schema])
+        self.item_adapter = TypeAdapter(schema)
+        self.pages = SNAPSHOT_PAGES if paginated else 1
+        self.page_size = SNAPSHOT_PAGE_SIZE if paginated else None
+        self.items = items
+
+
+# Crud modules import this one for refreshes_snapshot, so they're imported lazily here.
+# A limit of 0 is no limit to MongoDB, so each list query returns the whole collection in route order.
+async def _fetch_services():
+    from app.crud.service import get_services
+    return await get_services()
+
+
+async def _fetch_blogs():
+    from app.crud.blog import get_all_blogs
+    return await get_all_blogs(0, 0)
+
+
+async def _fetch_events():
+    from app.crud.event import get_all_events
+    return await get_all_events(0, 0)
+
+
+async def _fetch_insights():
+    from app.crud.insight import get_all_insights
+    return await get_all_insights(0, 0)
+
+
+async def _fetch_announcements():
+    from app.crud.announcement import get_all_announcements
+    return await get_all_announcements(0, 0)
+
+
+DATASETS = {
+    dataset.name: dataset
+    for dataset in (
+        Dataset("services", _fetch_services, ServiceResponse, paginated=False, items=False),
+        Dataset("blogs", _fetch_blogs, BlogResponseSchema),
+        Dataset("events", _fetch_events, EventResponseSchema),
+        Dataset("insights", _fetch_insights, InsightsResponseSchema),
+        Dataset("announcements", _fetch_announcements, AnnouncementResponseSchema),
+    )
+}
+
+
+def _render(dataset: Dataset, documents: list):
+    """
+    Render a dataset to {relative file name: JSON bytes}: its list pages and,
+    if it has them, a detail document per item.
+    """
+    records = dataset.list_adapter.validate_python(documents)
+    files = {}
+    for page in range(1, dataset.pages + 1):
+        if dataset.page_size:
+            chunk = records[(page - 1) * dataset.page_size:page * dataset.page_size]
+        else:
+            chunk = records
+        files[f"page-{page}.json"] = dataset.list_adapter.dump_json(chunk)
+    if dataset.items:
+        for record in records:
+            files[f"items/{record.id}.json"] = dataset.item_adapter.dump_json(record)
+    return files
+
+
+def _write_version(dataset: Dataset, files: dict):
+    """
+    Write rendered files as a version named after their content and point
+    CURRENT at it. Identical content always lands in the same version, so
+    every worker and every rebuild agrees on paths and ETags.
+    """
+    etags = {name: hashlib.sha256(content).hexdigest()[:20] for name, content in sorted(files.items())}
+    version = hashlib.sha256(json.dumps(etags, sort_keys=True).encode()).hexdigest()[:16]
+    dataset_root = SNAPSHOT_ROOT / dataset.name
+    version_dir = dataset_root / version
+
+    if not version_dir.exists():
+        staging = dataset_root / f".staging-{uuid.uuid4().hex}"
+        (staging / "items").mkdir(parents=True)
+        for name, content in files.items():
+            (staging / name).write_bytes(content)
+            # mtime=0 keeps the compressed bytes identical across rebuilds
+            (staging / f"{name}.gz").write_bytes(gzip.compress(content, compresslevel=9, mtime=0))
+        manifest = {
+            "dataset": dataset.name,
+            "version": version,
+            "built_at": time.time(),
+            "pages": dataset.pages,
+            "page_size": dataset.page_size,
+            "files": etags,
+        }
+        (staging / "manifest.json").write_text(json.dumps(manifest))
+        try:
+            staging.rename(version_dir)
+        except OSError:
+            # Another worker built the same version first
+            shutil.rmtree(staging, ignore_errors=True)
+
+    current = dataset_root / "CURRENT"
+    if not current.exists() or current.read_text() != version:
+        pointer = dataset_root / f".CURRENT-{uuid.uuid4().hex}"
+        pointer.write_text(version)
+        os.replace(pointer, current)
+        logger.info(f"Snapshot {dataset.name} now at version {version} ({len(files)} files)")
+    # Pruning keeps the most recently used versions
+    os.utime(version_dir)
+    _prune(dataset_root, version)
+    return version
+
+
+def _prune(dataset_root: Path, current: str):
+    versions = sorted(
+        (path for path in dataset_root.iterdir() if path.is_dir() and not path.name.startswith(".")),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )
+    for path in versions[SNAPSHOT_KEEP_VERSIONS:]:
+        if path.name != current:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+# One document per dataset counting the writes made to it through the API
+snapshot_changes_collection = db.snapshots_database.changes
+# One document per dataset and host: the change count its snapshot was last built at, and who is building it
+snapshot_builds_collection = db.snapshots_database.builds
+
+
+class SnapshotBuilder:
+    """
+    Renders the public datasets to precompressed JSON files on disk so the
+    snapshot routes serve them without touching MongoDB. Crud writes bump
+    their dataset's change count (see refreshes_snapshot); each worker
+    checks the counts and, for every dataset behind on its host, tries to
+    take the build lease. The one that gets it rebuilds, so every worker on
+    the host sees the new version after a single build. Datasets are also
+    rebuilt every SNAPSHOT_REFRESH_INTERVAL.
+    """
+
+    def __init__(self):
+        self.owner = uuid.uuid4().hex
+        self.wake = asyncio.Event()
+
+    async def mark_stale(self, name: str):
+        await snapshot_changes_collection.update_one({"_id": name}, {"$inc": {"count": 1}}, upsert=True)
+        self.wake.set()
+
+    async def _claim(self, name: str, changes: int, force: bool):
+        """
+        Take the lease on building this host's copy of a dataset if it's
+        behind, due for its periodic refresh, or forced. Returns False if
+        it's up to date or another worker holds the lease.
+        """
+        now = datetime.now(timezone.utc)
+        due = [{"built": {"$lt": changes}}, {"built_at": {"$lt": now - timedelta(seconds=SNAPSHOT_REFRESH_INTERVAL)}}]
+        query = {"_id": f"{SNAPSHOT_HOST}/{name}", "lease_until": {"$lt": now}}
+        if not force:
+            query["$or"] = due
+        try:
+            await snapshot_builds_collection.update_one(
+                query,
+                {
+                    "$set": {"lease_until": now + timedelta(seconds=SNAPSHOT_BUILD_LEASE), "owner": self.owner},
+                    "$setOnInsert": {"built": -1, "built_at": datetime.fromtimestamp(0, timezone.utc)},
+                },
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            # The document exists but didn't match: up to date, or leased to another worker
+            return False
+
+    async def build(self, name: str):
+        dataset = DATASETS[name]
+        documents = await dataset.fetch_all()
+        files = await asyncio.to_thread(_render, dataset, documents)
+        return await asyncio.to_thread(_write_version, dataset, files)
+
+    async def build_due(self):
+        changes = {
+            document["_id"]: document["count"]
+            async for document in snapshot_changes_collection.find({"_id": {"$in": list(DATASETS)}})
+        }
+        for name in sorted(DATASETS):
+            count = changes.get(name, 0)
+            # Rebuild regardless of the record if this host's files are gone
+            if not await self._claim(name, count, force=store.manifest(name) is None):
+                continue
+            build_id = f"{SNAPSHOT_HOST}/{name}"
+            try:
+                await self.build(name)
+            except Exception as e:
+                # Release the lease so the next check tries again
+                logger.error(f"Failed to build the {name} snapshot: {str(e)}")
+                await snapshot_builds_collection.update_one(
+                    {"_id": build_id, "owner": self.owner}, {"$set": {"lease_until": datetime.now(timezone.utc)}})
+                continue
+            now = datetime.now(timezone.utc)
+            await snapshot_builds_collection.update_one(
+                {"_id": build_id, "owner": self.owner},
+                {"$set": {"built": count, "built_at": now, "lease_until": now}},
+            )
+
+    async def run(self):
+        while True:
+            try:
+                await self.build_due()
+            except Exception as e:
+                logger.error(f"Failed to check the snapshots: {str(e)}")
+            try:
+                await asyncio.wait_for(self.wake.wait(), SNAPSHOT_POLL_INTERVAL)
+                # A write in this worker; let the rest of a burst of edits land first
+                await asyncio.sleep(SNAPSHOT_DEBOUNCE)
+            except asyncio.TimeoutError:
+                pass
+            self.wake.clear()
+
+
+builder = SnapshotBuilder()
+
+
+def refreshes_snapshot(name: str):
+    """
+    Decorator for crud functions that write to a snapshotted dataset: once
+    the write succeeds, the dataset is rebuilt in the background.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            result = await func(*args, **kwargs)
+            if SNAPSHOTS != "off":
+                try:
+                    await builder.mark_stale(name)
+                except Exception as e:
+                    # The write itself succeeded; the periodic refresh picks it up
+                    logger.error(f"Failed to mark the {name} snapshot stale: {str(e)}")
+            return result
+        return wrapper
+    return decorator
+
+
+class SnapshotStore:
+    # Reads the current version of each dataset, re-reading its manifest only when CURRENT changes
+    def __init__(self, root: Path = SNAPSHOT_ROOT):
+        self.root = root
+        self.manifests = {}
+
+    def manifest(self, name: str):
+        current = self.root / name / "CURRENT"
+        try:
+            changed = current.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        cached = self.manifests.get(name)
+        if cached and cached[0] == changed:
+            return cached[1]
+        version = current.read_text()
+        manifest = json.loads((self.root / name / version / "manifest.json").read_text())
+        self.manifests[name] = (changed, manifest)
+        return manifest
+
+    def resolve(self, name: str, file_name: str):
+        """
+        Return (path, etag, version) for a file in the dataset's current
+        snapshot, or None if it has none.
+        """
+        if name not in DATASETS:
+            return None
+        manifest = self.manifest(name)
+        if manifest is None or file_name not in manifest["files"]:
+            return None
+        path = self.root / name / manifest["version"] / file_name
+        return path, manifest["files"][file_name], manifest["version"]
+
+
+store = SnapshotStore()
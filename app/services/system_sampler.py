@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Seconds between samples
+SAMPLE_INTERVAL = float(os.getenv("SYSTEM_SAMPLE_INTERVAL", "5"))
+# Samples kept per worker; an hour at the default interval
+HISTORY_SIZE = int(os.getenv("SYSTEM_HISTORY_SIZE", "720"))
+
+
+class SystemSampler:
+    """
+    Samples host and process metrics on a timer so requests never wait on
+    psutil. CPU is measured since the previous sample instead of blocking
+    for an interval. psutil is imported on the first sample, not at startup.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL, history_size: int = HISTORY_SIZE):
+        self.interval = interval
+        self.samples = deque(maxlen=history_size)
+        self._process = None
+
+    @property
+    def process(self):
+        if self._process is None:
+            import psutil
+            self._process = psutil.Process()
+            # The first non-blocking reading is meaningless; take it now so the first sample isn't 0
+            psutil.cpu_percent(interval=None)
+            self._process.cpu_percent(interval=None)
+        return self._process
+
+    def sample(self, loop_lag: float = 0.0):
+        import psutil
+
+        process = self.process
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage("/")
+        with process.oneshot():
+            rss = process.memory_info().rss
+            process_cpu = process.cpu_percent(interval=None)
+            # num_fds only exists on POSIX
+            open_fds = process.num_fds() if hasattr(process, "num_fds") else None
+        return {
+            "timestamp": time.time(),
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "memory_percent": memory.percent,
+            "disk_percent": disk.percent,
+            "process_cpu_percent": process_cpu,
+            "process_rss_bytes": rss,
+            "open_fds": open_fds,
+            "loop_lag_ms": round(loop_lag * 1000, 2),
+        }
+
+    def latest(self):
+        if not self.samples:
+            self.samples.append(self.sample())
+        return self.samples[-1]
+
+    def history(self, window: float):
+        since = time.time() - window
+        return [sample for sample in self.samples if sample["timestamp"] >= since]
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.process  # Start the CPU counters so the first sample covers a full interval
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            # How late the timer fired is how long the loop was too busy to run it
+            loop_lag = max(loop.time() - expected, 0.0)
+            try:
+                self.samples.append(self.sample(loop_lag))
+            except Exception as e:
+                logger.error(f"Failed to sample system metrics: {str(e)}")
+
+
+sampler = SystemSampler()
@@ -0,0 +1,198 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from fastapi import HTTPException
+from app.utils.metrics import format_labels
+
+logger = logging.getLogger(__name__)
+
+# Seconds of recent calls the failure rate is worked out over
+BREAKER_WINDOW = float(os.getenv("BREAKER_WINDOW", "60"))
+# Calls needed in the window before the failure rate can open a breaker
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+# Share of failed calls in the window that opens a breaker
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+# Seconds an open breaker fails fast before letting a trial call through
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATES = (CLOSED, OPEN, HALF_OPEN)
+
+# Every breaker by name, for diagnostics and metrics
+breakers = {}
+
+
+class CircuitOpenError(HTTPException):
+    # Raised instead of calling a dependency that is known to be down
+    def __init__(self, breaker: "CircuitBreaker"):
+        super().__init__(
+            status_code=503,
+            detail=f"{breaker.name} is temporarily unavailable, please retry shortly",
+            headers={"Retry-After": str(max(math.ceil(breaker.retry_in()), 1))},
+        )
+        self.breaker = breaker
+
+
+class CircuitBreaker:
+    """
+    Fails calls to an external dependency fast while it is unhealthy.
+
+    Closed: calls go through, and the breaker opens once at least min_calls
+    in the last `window` seconds have been made and failure_rate of them
+    failed. Open: calls raise CircuitOpenError without being made. After
+    reset_timeout it goes half-open and lets one trial call through, which
+    closes it again on success or reopens it on failure.
+
+    is_failure(error) decides whether an exception means the dependency is
+    unhealthy; errors that are the caller's fault (bad input, 4xx) don't count.
+    """
+
+    def __init__(self, name: str, is_failure=None, window: float = BREAKER_WINDOW, min_calls: int = BREAKER_MIN_CALLS,
+                 failure_rate: float = BREAKER_FAILURE_RATE, reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.is_failure = is_failure or (lambda error: True)
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.reset_timeout = reset_timeout
+        # Calls come from the event loop and from threadpool workers
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        # (monotonic time, failed) for each call in the window
+        self.calls = deque()
+        self.opened_at = None
+        self.trial_running = False
+        self.times_opened = 0
+        self.rejected = 0
+        self.last_error = None
+        breakers[name] = self
+
+    def retry_in(self):
+        if self.state != OPEN:
+            return 0.0
+        return max(self.opened_at + self.reset_timeout - time.monotonic(), 0.0)
+
+    def check(self):
+        # Fail fast while open, without taking the half-open trial call
+        with self.lock:
+            if self.state == OPEN and self.retry_in() > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self)
+
+    def _acquire(self):
+        with self.lock:
+            if self.state == OPEN:
+                if self.retry_in() > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self)
+                self.state = HALF_OPEN
+                logger.info(f"Circuit breaker {self.name} half-open, trying a call")
+            if self.state == HALF_OPEN:
+                if self.trial_running:
+                    self.rejected += 1
+                    raise CircuitOpenError(self)
+                self.trial_running = True
+                return True
+            return False
+
+    def _record(self, trial: bool, failed: bool, error: Exception = None):
+        with self.lock:
+            now = time.monotonic()
+            if failed:
+                self.last_error = {"at": time.time(), "error": f"{type(error).__name__}: {error}"}
+            if trial:
+                self.trial_running = False
+                if failed:
+                    self._open(now)
+                else:
+                    self.state = CLOSED
+                    self.calls.clear()
+                    logger.info(f"Circuit breaker {self.name} closed")
+                return
+            if self.state != CLOSED:
+                # Started before the breaker opened; the trial call decides what happens next
+                return
+
+            self.calls.append((now, failed))
+            while self.calls and self.calls[0][0] < now - self.window:
+                self.calls.popleft()
+            if failed and len(self.calls) >= self.min_calls:
+                failures = sum(1 for _, call_failed in self.calls if call_failed)
+                if failures / len(self.calls) >= self.failure_rate:
+                    self._open(now)
+
+    def _open(self, now: float):
+        self.state = OPEN
+        self.opened_at = now
+        self.times_opened += 1
+        self.calls.clear()
+        logger.warning(f"Circuit breaker {self.name} opened for {self.reset_timeout}s: {self.last_error['error']}")
+
+    def _release(self, trial: bool):
+        if trial:
+            with self.lock:
+                self.trial_running = False
+
+    @contextmanager
+    def guard(self):
+        """
+        Wrap a single call to the dependency:
+
+            with breaker.guard():
+                response = requests.post(...)
+        """
+        trial = self._acquire()
+        try:
+            yield
+        except Exception as e:
+            self._record(trial, self.is_failure(e), e)
+            raise
+        except BaseException:
+            # Cancelled (e.g. by the request deadline) before the outcome was known
+            self._release(trial)
+            raise
+        else:
+            self._record(trial, False)
+
+    def stats(self):
+        with self.lock:
+            failures = sum(1 for _, failed in self.calls if failed)
+            return {
+                "name": self.name,
+                "state": self.state,
+                "retry_in_s": round(self.retry_in(), 1),
+                "window_calls": len(self.calls),
+                "window_failures": failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+            }
+
+
+def report():
+    return [breaker.stats() for breaker in breakers.values()]
+
+
+def render():
+    lines = [
+        "# HELP circuit_breaker_state Current state of each circuit breaker (1 for the active state).",
+        "# TYPE circuit_breaker_state gauge",
+    ]
+    for breaker in breakers.values():
+        for state in STATES:
+            lines.append(f"circuit_breaker_state{{{format_labels(name=breaker.name, state=state)}}} {int(breaker.state == state)}")
+    lines.append("# HELP circuit_breaker_rejected_total Calls failed fast because the breaker was open.")
+    lines.append("# TYPE circuit_breaker_rejected_total counter")
+    for breaker in breakers.values():
+        lines.append(f"circuit_breaker_rejected_total{{{format_labels(name=breaker.name)}}} {breaker.rejected}")
+    lines.append("# HELP circuit_breaker_opened_total Times each breaker has opened.")
+    lines.append("# TYPE circuit_breaker_opened_total counter")
+    for breaker in breakers.values():
+        lines.append(f"circuit_breaker_opened_total{{{format_labels(name=breaker.name)}}} {breaker.times_opened}")
+    return lines
@@ -1,35 +1,86 @@
 import os
+import time
+from typing import List, Optional
 
 from fastapi import HTTPException
 import cloudinary
-import cloudinary.uploader
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# Retrieve the Cloudinary URL from environment variables
-CLOUDINARY_URL = os.getenv("CLOUDINARY_URL")
-
-# Ensure that the Cloudinary URL is loaded correctly
-if not CLOUDINARY_URL:
-    raise ValueError("Cloudinary configuration is missing. Please check your .env file.")
-
-# Configure Cloudinary using the CLOUDINARY_URL
-cloudinary.config(cloudinary_url=CLOUDINARY_URL)
-
-# Function to upload a file to Cloudinary
-def upload(file):
-    try:
-        result = cloudinary.uploader.upload(file)
-        return result
-    except cloudinary.exceptions.Error as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    
-
-def delete(public_id):
-    try:
-        result = cloudinary.uploader.destroy(public_id)
-        return result
-    except cloudinary.exceptions.Error as e:
-        raise HTTPException(status_code=500, detail=str(e))
+import cloudinary.api
+import cloudinary.utils
+from app.schemas.upload import SignedUpload
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.deadlines import timeout_for
+from app.utils.storage import ALLOWED_FORMATS, StorageBackend
+
+# Seconds to wait on a Cloudinary admin API call, less if the request's deadline is nearer
+CLOUDINARY_TIMEOUT = float(os.getenv("CLOUDINARY_TIMEOUT", "30"))
+
+# Errors that mean the request was wrong rather than that Cloudinary is unhealthy
+CLIENT_ERRORS = (
+    cloudinary.exceptions.BadRequest,
+    cloudinary.exceptions.AuthorizationRequired,
+    cloudinary.exceptions.NotAllowed,
+    cloudinary.exceptions.NotFound,
+    cloudinary.exceptions.AlreadyExists,
+)
+
+cloudinary_breaker = CircuitBreaker("cloudinary", is_failure=lambda error: not isinstance(error, CLIENT_ERRORS))
+
+
+class CloudinaryStorage(StorageBackend):
+    def __init__(self):
+        # Ensure that the Cloudinary URL is loaded correctly
+        if not os.getenv("CLOUDINARY_URL"):
+            raise ValueError("Cloudinary configuration is missing. Please check your .env file.")
+
+        # Configure Cloudinary from CLOUDINARY_URL (re-read now that .env is loaded, so
+        # cloud_name, api_key and api_secret are all available for local signing)
+        cloudinary.reset_config()
+        self.config = cloudinary.config()
+
+    def sign_upload(self, folder: str):
+        """
+        Issue signed parameters so the browser can upload straight to Cloudinary.
+        The signature is computed locally; Cloudinary rejects it after one hour.
+        Refused while Cloudinary is known to be down, rather than letting the upload fail.
+        """
+        cloudinary_breaker.check()
+        params = {
+            "timestamp": int(time.time()),
+            "folder": folder,
+            "allowed_formats": ALLOWED_FORMATS,
+        }
+        signature = cloudinary.utils.api_sign_request(params, self.config.api_secret)
+
+        return {
+            **params,
+            "upload_url": f"https://api.cloudinary.com/v1_1/{self.config.cloud_name}/image/upload",
+            "api_key": self.config.api_key,
+            "cloud_name": self.config.cloud_name,
+            "signature": signature,
+        }
+
+    def verify_signature(self, upload: SignedUpload):
+        return cloudinary.utils.verify_api_response_signature(upload.public_id, upload.version, upload.signature)
+
+    def asset_url_prefix(self, upload: SignedUpload):
+        return f"https://res.cloudinary.com/{self.config.cloud_name}/image/upload/v{upload.version}/{upload.public_id}."
+
+    def delete_batch(self, public_ids: List[str]):
+        try:
+            with cloudinary_breaker.guard():
+                return cloudinary.api.delete_resources(public_ids, timeout=timeout_for(CLOUDINARY_TIMEOUT))
+        except cloudinary.exceptions.Error as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    def list_assets(self, next_cursor: Optional[str] = None, max_results: int = 500, prefix: Optional[str] = None):
+        options = {"type": "upload", "resource_type": "image", "max_results": max_results}
+        if prefix:
+            options["prefix"] = prefix
+        if next_cursor:
+            options["next_cursor"] = next_cursor
+
+        try:
+            with cloudinary_breaker.guard():
+                return cloudinary.api.resources(**options, timeout=timeout_for(CLOUDINARY_TIMEOUT))
+        except cloudinary.exceptions.Error as e:
+            raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,83 @@
+import functools
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+import pymongo
+
+# Seconds a request may run before it is answered with 504; 0 disables the deadline
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "30"))
+# Per-route budgets by path prefix, longest match wins, e.g. "/media/image/upload=120,/api/blogs=10"
+ROUTE_DEADLINES = {
+    prefix.strip(): float(seconds)
+    for prefix, _, seconds in (
+        item.partition("=")
+        for item in os.getenv("ROUTE_DEADLINES", "/media/image/upload=120").split(",")
+    )
+    if prefix.strip()
+}
+# Shortest timeout given to an outbound call, however little of the budget is left
+MIN_OUTBOUND_TIMEOUT = 0.1
+
+# Monotonic time by which the current request must be answered, if it has a deadline
+request_deadline: ContextVar = ContextVar("request_deadline", default=None)
+
+
+def budget_for(scope: dict) -> Optional[float]:
+    path = scope["path"]
+    matches = [prefix for prefix in ROUTE_DEADLINES if path.startswith(prefix)]
+    seconds = ROUTE_DEADLINES[max(matches, key=len)] if matches else REQUEST_DEADLINE
+    return seconds or None
+
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    if not seconds:
+        yield
+        return
+    token = request_deadline.set(time.monotonic() + seconds)
+    try:
+        # Motor runs pymongo in an executor with a copy of this context, so every
+        # query in the request gets the remaining budget as maxTimeMS
+        with pymongo.timeout(seconds):
+            yield
+    finally:
+        request_deadline.reset(token)
+
+
+@contextmanager
+def no_deadline():
+    # Run a block with no deadline, e.g. work that carries on after the response
+    token = request_deadline.set(None)
+    try:
+        with pymongo.timeout(None):
+            yield
+    finally:
+        request_deadline.reset(token)
+
+
+def without_deadline(func):
+    """
+    Wrap an async function passed to BackgroundTasks. Background tasks run
+    after the response but still inside the request's context, where the
+    deadline has usually all but run out.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with no_deadline():
+            return await func(*args, **kwargs)
+    return wrapper
+
+
+def remaining() -> Optional[float]:
+    at = request_deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def timeout_for(default: float) -> float:
+    # Timeout for an outbound call: its own default, capped by what's left of the request's budget
+    left = remaining()
+    if left is None:
+        return default
+    return max(min(default, left), MIN_OUTBOUND_TIMEOUT)
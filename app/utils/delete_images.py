@@ -1,13 +1,65 @@
-from typing import List
-from cloudinary.uploader import destroy as cloudinary_destroy
-
-async def delete_images_from_cloudinary(image_urls: List[str]):
-    for image_url in image_urls:
-        # Extract the public_id from the URL
-        public_id = image_url.split('/')[-1].split('.')[0]  # Assume URL structure like 'https://res.cloudinary.com/.../image.jpg'
-        try:
-            # Delete the image from Cloudinary
-            cloudinary_destroy(public_id)
-        except Exception as e:
-            # Log or handle error if Cloudinary deletion fails
-            print(f"Error deleting image {public_id} from Cloudinary: {str(e)}")
+import logging
+import re
+from typing import List, Optional
+from urllib.parse import unquote, urlparse
+
+from starlette.concurrency import run_in_threadpool
+from app.utils.deadlines import without_deadline
+from app.utils.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+# Cloudinary's bulk delete accepts at most 100 public IDs per call
+DELETE_BATCH_SIZE = 100
+
+VERSION_SEGMENT = re.compile(r"^v\d+$")
+
+
+def public_id_from_url(image_url: str) -> Optional[str]:
+    """
+    Extract the public_id (including folders) from a stored image URL, e.g.
+    https://res.cloudinary.com/<cloud>/image/upload/v1712345678/blogs/cover.jpg -> blogs/cover
+    Local storage URLs use the same /image/upload/v<version>/ layout.
+    """
+    segments = [unquote(segment) for segment in urlparse(image_url).path.split("/") if segment]
+    if "upload" not in segments:
+        return None
+
+    segments = segments[segments.index("upload") + 1:]
+
+    # Everything up to and including the version segment is delivery options
+    for index, segment in enumerate(segments):
+        if VERSION_SEGMENT.match(segment):
+            segments = segments[index + 1:]
+            break
+
+    if not segments:
+        return None
+
+    segments[-1] = segments[-1].rsplit(".", 1)[0]
+    return "/".join(segments)
+
+
+def _delete_batch(public_ids: List[str]) -> int:
+    try:
+        result = get_storage().delete_batch(public_ids)
+    except Exception as e:
+        # The document is already gone, so log and carry on with the next batch
+        logger.error(f"Error deleting images {public_ids}: {str(e)}")
+        return 0
+    return sum(1 for status in (result or {}).get("deleted", {}).values() if status == "deleted")
+
+
+async def delete_public_ids(public_ids: List[str]) -> int:
+    # Bulk delete in batches, off the event loop; returns how many were actually deleted
+    deleted = 0
+    for start in range(0, len(public_ids), DELETE_BATCH_SIZE):
+        deleted += await run_in_threadpool(_delete_batch, public_ids[start:start + DELETE_BATCH_SIZE])
+    return deleted
+
+
+# Only queued as a background task, after the response
+@without_deadline
+async def delete_images(image_urls: List[str]):
+    public_ids = [public_id for public_id in map(public_id_from_url, image_urls) if public_id]
+    await delete_public_ids(public_ids)
@@ -0,0 +1,201 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict
+from fastapi import HTTPException, Request, Response
+from fastapi.routing import APIRoute
+from pymongo.errors import DuplicateKeyError
+from app.db.connection import db
+from app.utils.deadlines import budget_for, remaining
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+MAX_KEY_LENGTH = 255
+# Hours a completed request's response is replayed for
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+# Seconds past the route's deadline before a first request that never finished (e.g. its worker died) can be taken over
+IDEMPOTENCY_LOCK_GRACE = 5
+# Lock for routes without a deadline
+IDEMPOTENCY_LOCK_SECONDS = 60
+# Seconds between checks while waiting on a first request running in another worker
+POLL_INTERVAL = 0.1
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+# One document per key, removed by a TTL index once expires_at has passed
+idempotency_collection = db.idempotency_database.requests
+indexes_ready = False
+
+# Keys whose first request is running in this worker -> set once it has finished
+_running: Dict[str, asyncio.Event] = {}
+# Strong references to releases still running after a failed request
+_releasing = set()
+
+
+async def _ensure_indexes():
+    global indexes_ready
+    if not indexes_ready:
+        await idempotency_collection.create_index("expires_at", expireAfterSeconds=0)
+        indexes_ready = True
+
+
+async def _fingerprint(request: Request):
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith(("multipart/form-data", "application/x-www-form-urlencoded")):
+        # Multipart boundaries change between retries, so hash the fields rather than the raw body.
+        # Starlette caches the parsed form, so the route doesn't parse it again.
+        form = await request.form()
+        fields = sorted(
+            (key, value if isinstance(value, str) else f"{value.filename}:{value.size}")
+            for key, value in form.multi_items()
+        )
+        payload = json.dumps(fields).encode()
+    else:
+        payload = await request.body()
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _replay(record: dict):
+    return Response(
+        content=record["body"],
+        status_code=record["status_code"],
+        media_type=record["media_type"],
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+async def _claim(record_id: str, fingerprint: str, lock_seconds: float):
+    """
+    Take the key for this request, or wait for the request that holds it.
+    Returns None once this request owns the key, or the stored record of
+    the first request to replay.
+    """
+    while True:
+        now = datetime.now(timezone.utc)
+        try:
+            await idempotency_collection.insert_one({
+                "_id": record_id,
+                "fingerprint": fingerprint,
+                "status": IN_PROGRESS,
+                "expires_at": now + timedelta(seconds=lock_seconds),
+            })
+            return None
+        except DuplicateKeyError:
+            pass
+
+        record = await idempotency_collection.find_one({"_id": record_id})
+        if record is None:
+            # The first request failed and released the key; try again
+            continue
+        if record["fingerprint"] != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        if record["status"] == COMPLETED:
+            return record
+        if record["expires_at"].replace(tzinfo=timezone.utc) <= now:
+            # The first request outlived its deadline without finishing; take the key over
+            await idempotency_collection.delete_one({"_id": record_id, "status": IN_PROGRESS, "expires_at": record["expires_at"]})
+            continue
+
+        left = remaining()
+        if left is not None and left < POLL_INTERVAL:
+            raise HTTPException(
+                status_code=409,
+                detail="A request with this Idempotency-Key is still in progress",
+                headers={"Retry-After": "1"},
+            )
+        running = _running.get(record_id)
+        if running:
+            # The first request is in this worker, so wake as soon as it's done
+            try:
+                await asyncio.wait_for(running.wait(), lock_seconds)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            await asyncio.sleep(POLL_INTERVAL)
+
+
+async def _finish(record_id: str, response: Response = None):
+    body = getattr(response, "body", None)
+    if response is None or body is None or response.status_code >= 500:
+        # Nothing worth replaying; let a retry run the request again
+        await idempotency_collection.delete_one({"_id": record_id, "status": IN_PROGRESS})
+        return
+    await idempotency_collection.update_one(
+        {"_id": record_id},
+        {"$set": {
+            "status": COMPLETED,
+            "status_code": response.status_code,
+            "media_type": response.media_type,
+            "body": body,
+            "expires_at": datetime.now(timezone.utc) + timedelta(hours=IDEMPOTENCY_TTL_HOURS),
+        }},
+    )
+
+
+def _release_later(record_id: str):
+    # The request failed or was cancelled; release the key from a fresh context,
+    # since a cancelled request's deadline has already expired
+    async def release():
+        try:
+            await _finish(record_id)
+        except Exception as e:
+            logger.error(f"Failed to release idempotency key {record_id}: {str(e)}")
+
+    task = asyncio.create_task(release(), context=contextvars.Context())
+    _releasing.add(task)
+    task.add_done_callback(_releasing.discard)
+
+
+async def run_once(request: Request, key: str, handler: Callable):
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+
+    await _ensure_indexes()
+    record_id = f"{request.method} {request.url.path} {key}"
+    lock_seconds = (budget_for(request.scope) or IDEMPOTENCY_LOCK_SECONDS) + IDEMPOTENCY_LOCK_GRACE
+    record = await _claim(record_id, await _fingerprint(request), lock_seconds)
+    if record:
+        return _replay(record)
+
+    _running[record_id] = asyncio.Event()
+    try:
+        try:
+            response = await handler(request)
+        except BaseException:
+            _release_later(record_id)
+            raise
+        try:
+            await _finish(record_id, response)
+        except Exception as e:
+            # The response is still good; a retry waits out the lock and runs again
+            logger.error(f"Failed to store idempotent response for {record_id}: {str(e)}")
+        return response
+    finally:
+        _running.pop(record_id).set()
+
+
+class IdempotentRoute(APIRoute):
+    """
+    Route class for endpoints that clients retry: a POST carrying an
+    Idempotency-Key header runs at most once per key. Repeats get the first
+    response replayed (with Idempotent-Replayed: true), and concurrent
+    repeats wait for the first request instead of running alongside it.
+    Reusing a key with a different body is rejected with 422.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def idempotent_handler(request: Request) -> Response:
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if request.method != "POST" or key is None:
+                return await handler(request)
+            return await run_once(request, key, handler)
+
+        return idempotent_handler
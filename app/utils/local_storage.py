@@ -0,0 +1,185 @@
+import hashlib
+import hmac
+import itertools
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+import anyio
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from app.schemas.upload import SignedUpload
+from app.utils.storage import ALLOWED_FORMATS, StorageBackend
+
+# Matches Cloudinary, which rejects upload signatures older than an hour
+UPLOAD_SIGNATURE_TTL = 3600
+
+
+class LocalStorage(StorageBackend):
+    """
+    Keeps images on local disk under MEDIA_ROOT and serves them from
+    /media/image/upload/v<version>/<public_id>.<ext>, the same layout as
+    Cloudinary delivery URLs so stored URLs parse the same way.
+    """
+
+    def __init__(self):
+        self.root = Path(os.getenv("MEDIA_ROOT", "media")).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.base_url = os.getenv("MEDIA_BASE_URL", "http://localhost:8000").rstrip("/")
+        self.secret = (os.getenv("MEDIA_SIGNING_SECRET") or os.getenv("JWT_SECRET_KEY") or "").encode()
+        if not self.secret:
+            raise ValueError("Local media storage needs MEDIA_SIGNING_SECRET or JWT_SECRET_KEY to sign uploads.")
+
+    def _sign(self, params: dict):
+        payload = "&".join(f"{key}={params[key]}" for key in sorted(params))
+        return hmac.new(self.secret, payload.encode(), hashlib.sha256).hexdigest()
+
+    def sign_upload(self, folder: str):
+        params = {
+            "timestamp": int(time.time()),
+            "folder": folder,
+            "allowed_formats": ALLOWED_FORMATS,
+        }
+        return {
+            **params,
+            "upload_url": f"{self.base_url}/media/image/upload",
+            "api_key": "local",
+            "cloud_name": "local",
+            "signature": self._sign(params),
+        }
+
+    def verify_upload_request(self, timestamp: int, folder: str, allowed_formats: str, signature: str):
+        expected = self._sign({"timestamp": timestamp, "folder": folder, "allowed_formats": allowed_formats})
+        if not hmac.compare_digest(expected, signature):
+            raise HTTPException(status_code=401, detail="Invalid upload signature")
+        if time.time() - timestamp > UPLOAD_SIGNATURE_TTL:
+            raise HTTPException(status_code=401, detail="Upload signature has expired")
+
+    def save(self, file, folder: str, extension: str):
+        """
+        Store an uploaded file and return a Cloudinary-style upload result.
+        """
+        public_id = f"{folder}/{uuid.uuid4().hex}"
+        path = self.root / f"{public_id}.{extension}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as destination:
+            shutil.copyfileobj(file, destination)
+
+        version = int(time.time())
+        return {
+            "public_id": public_id,
+            "version": version,
+            "signature": self._sign({"public_id": public_id, "version": version}),
+            "format": extension,
+            "secure_url": f"{self.base_url}/media/image/upload/v{version}/{public_id}.{extension}",
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    def verify_signature(self, upload: SignedUpload):
+        expected = self._sign({"public_id": upload.public_id, "version": upload.version})
+        return hmac.compare_digest(expected, upload.signature)
+
+    def asset_url_prefix(self, upload: SignedUpload):
+        return f"{self.base_url}/media/image/upload/v{upload.version}/{upload.public_id}."
+
+    def resolve(self, path: str) -> Optional[Path]:
+        # Drop the version segment and refuse anything outside MEDIA_ROOT
+        segments = path.split("/")
+        if segments and segments[0][:1] == "v" and segments[0][1:].isdigit():
+            segments = segments[1:]
+
+        file_path = self.root.joinpath(*segments).resolve()
+        if not file_path.is_relative_to(self.root) or not file_path.is_file():
+            return None
+        return file_path
+
+    def delete_batch(self, public_ids: List[str]):
+        deleted = {}
+        for public_id in public_ids:
+            deleted[public_id] = "not_found"
+            for path in self.root.glob(f"{public_id}.*"):
+                if path.resolve().is_relative_to(self.root):
+                    path.unlink(missing_ok=True)
+                    deleted[public_id] = "deleted"
+        return {"deleted": deleted}
+
+    def _walk(self, directory: Path, parts: tuple, after: tuple):
+        """
+        Yield (path segments, DirEntry) for files under directory in path order,
+        starting after the `after` segments. Subtrees that sort wholly before
+        it are skipped without being read.
+        """
+        with os.scandir(directory) as scan:
+            entries = sorted(scan, key=lambda entry: entry.name)
+        for entry in entries:
+            entry_parts = parts + (entry.name,)
+            if entry.is_dir(follow_symlinks=False):
+                if entry_parts >= after[:len(entry_parts)]:
+                    yield from self._walk(Path(entry.path), entry_parts, after)
+            elif entry.is_file() and entry_parts > after:
+                yield entry_parts, entry
+
+    def list_assets(self, next_cursor: Optional[str] = None, max_results: int = 500, prefix: Optional[str] = None):
+        # The cursor is the last public path returned, so each page resumes the walk
+        # there instead of listing and sorting the whole tree again
+        prefix = prefix or ""
+        folder = tuple(segment for segment in prefix.split("/")[:-1] if segment)
+        base = self.root.joinpath(*folder).resolve()
+        if not base.is_relative_to(self.root) or not base.is_dir():
+            return {"resources": [], "next_cursor": None}
+
+        after = tuple(next_cursor.split("/")) if next_cursor else ()
+        files = (
+            (parts, entry) for parts, entry in self._walk(base, folder, after)
+            if "/".join(parts).startswith(prefix)
+        )
+        page = list(itertools.islice(files, max_results + 1))
+        more = len(page) > max_results
+        page = page[:max_results]
+
+        resources = [
+            {
+                "public_id": Path(*parts).with_suffix("").as_posix(),
+                "created_at": datetime.fromtimestamp(entry.stat().st_mtime, timezone.utc).isoformat(),
+            }
+            for parts, entry in page
+        ]
+        return {"resources": resources, "next_cursor": "/".join(page[-1][0]) if more else None}
+
+
+class MediaFileResponse(FileResponse):
+    """
+    FileResponse that hands whole-file GETs to the server for zero-copy sending
+    when it supports the ASGI pathsend or zerocopy extension. HEAD and Range
+    requests, and servers with neither extension, go through FileResponse
+    unchanged. Only ASGI messages and FileResponse's public set_stat_headers
+    are used, so a Starlette upgrade can't change what this sends.
+    """
+
+    async def __call__(self, scope, receive, send):
+        extensions = scope.get("extensions") or {}
+        pathsend = "http.response.pathsend" in extensions
+        if (not pathsend and "http.response.zerocopy" not in extensions) \
+                or scope["method"] != "GET" or Headers(scope=scope).get("range") is not None:
+            await super().__call__(scope, receive, send)
+            return
+
+        try:
+            stat_result = await anyio.to_thread.run_sync(os.stat, self.path)
+        except FileNotFoundError:
+            raise RuntimeError(f"File at path {self.path} does not exist.")
+        self.set_stat_headers(stat_result)
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if pathsend:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+        else:
+            with open(self.path, "rb") as file:
+                await send({"type": "http.response.zerocopy", "file": file, "more_body": False})
+        if self.background is not None:
+            await self.background()
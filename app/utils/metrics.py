@@ -0,0 +1,95 @@
+from bisect import bisect_left
+from collections import defaultdict
+
+# Latency bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Any other request method is recorded as "OTHER" to keep label cardinality bounded
+HTTP_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        # One slot per bucket plus +Inf; cumulative counts are computed when rendering
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str):
+        lines = []
+        cumulative = 0
+        prefix = f"{labels}," if labels else ""
+        suffix = f"{{{labels}}}" if labels else ""
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{suffix} {self.sum}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(**labels) -> str:
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+
+class MetricsRegistry:
+    """
+    Per-route request metrics, kept in plain dicts so recording a request
+    costs a few dict lookups. Routes are templates, so cardinality is bounded.
+    """
+
+    def __init__(self):
+        self.latency = {}  # (route, method) -> Histogram
+        self.responses = defaultdict(int)  # (route, method, status) -> count
+        self.in_flight = defaultdict(int)  # method -> requests being handled
+        # Callables returning extra exposition lines, e.g. from the Mongo command monitor
+        self.collectors = []
+
+    def register(self, collector):
+        self.collectors.append(collector)
+
+    def observe_request(self, route: str, method: str, status: int, duration: float):
+        histogram = self.latency.get((route, method))
+        if histogram is None:
+            histogram = self.latency[(route, method)] = Histogram()
+        histogram.observe(duration)
+        self.responses[(route, method, status)] += 1
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by route template and method.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (route, method), histogram in list(self.latency.items()):
+            lines.extend(histogram.render("http_request_duration_seconds", format_labels(route=route, method=method)))
+
+        lines.append("# HELP http_responses_total Responses by route template, method and status code.")
+        lines.append("# TYPE http_responses_total counter")
+        for (route, method, status), count in list(self.responses.items()):
+            lines.append(f"http_responses_total{{{format_labels(route=route, method=method, status=status)}}} {count}")
+
+        lines.append("# HELP http_requests_in_flight Requests currently being handled.")
+        lines.append("# TYPE http_requests_in_flight gauge")
+        for method, count in list(self.in_flight.items()):
+            lines.append(f"http_requests_in_flight{{{format_labels(method=method)}}} {count}")
+
+        for collector in self.collectors:
+            lines.extend(collector())
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,85 @@
+import asyncio
+import time
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from app.utils.deadlines import budget_for, deadline
+
+
+class RequestPipeline:
+    """
+    Pure ASGI middleware that times each HTTP request once and runs every
+    hook around it, without BaseHTTPMiddleware's extra task and response
+    stream per request.
+
+    A hook has start(scope) -> state, called before the app, and
+    finish(scope, state, status, duration), called once the last of the
+    response body has been sent, before any background tasks run, or
+    else once the app has returned or raised (status 500 unless one was
+    sent).
+    start() may raise HTTPException to turn the request away; only the
+    hooks already started are finished.
+
+    Each request also runs under its route's deadline (app.utils.deadlines).
+    If it hasn't started responding by then it is cancelled and answered
+    with 504; once it has, it is no longer cancelled. Background tasks
+    that need more than what is left of the budget are wrapped with
+    without_deadline.
+    """
+
+    def __init__(self, app, hooks):
+        self.app = app
+        self.hooks = list(hooks)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        budget = None
+        timeout = None
+        responding = False
+        finished = False
+        states = []
+
+        def finish():
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            duration = time.perf_counter() - start
+            for hook, state in zip(self.hooks, states):
+                hook.finish(scope, state, status, duration)
+
+        async def send_with_status(message):
+            nonlocal status, responding
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                responding = True
+                if budget:
+                    timeout.reschedule(None)
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                # The client has its response; background tasks run after this
+                finish()
+
+        start = time.perf_counter()
+        try:
+            for hook in self.hooks:
+                states.append(hook.start(scope))
+            budget = budget_for(scope)
+            async with asyncio.timeout(budget) as timeout:
+                with deadline(budget):
+                    await self.app(scope, receive, send_with_status)
+        except HTTPException as e:
+            # Only hooks raise these here; the app's own are handled inside it
+            status = e.status_code
+            await JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)(scope, receive, send)
+        except TimeoutError:
+            if responding or timeout is None or not timeout.expired():
+                raise
+            status = 504
+            await JSONResponse({"detail": "Request timed out"}, status_code=504)(scope, receive, send)
+        finally:
+            # Responses that never sent their last body, and the ones answered here
+            finish()
@@ -0,0 +1,95 @@
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import List, Optional
+
+from fastapi import HTTPException
+from pydantic import TypeAdapter, ValidationError
+from app.config import MEDIA_STORAGE
+from app.schemas.upload import SignedUpload
+
+# Only these formats may be uploaded with a signature issued by this API
+ALLOWED_FORMATS = "jpg,jpeg,png,gif,webp,avif"
+
+signed_uploads_adapter = TypeAdapter(List[SignedUpload])
+
+
+class StorageBackend(ABC):
+    """
+    Where uploaded images live. Browsers upload directly to the backend with
+    parameters signed by sign_upload; the API only verifies the results.
+    """
+
+    @abstractmethod
+    def sign_upload(self, folder: str) -> dict:
+        ...
+
+    @abstractmethod
+    def verify_signature(self, upload: SignedUpload) -> bool:
+        ...
+
+    @abstractmethod
+    def asset_url_prefix(self, upload: SignedUpload) -> str:
+        ...
+
+    @abstractmethod
+    def delete_batch(self, public_ids: List[str]) -> dict:
+        """
+        Delete stored images and return {"deleted": {public_id: "deleted" or "not_found"}}.
+        """
+
+    @abstractmethod
+    def list_assets(self, next_cursor: Optional[str] = None, max_results: int = 500, prefix: Optional[str] = None) -> dict:
+        """
+        Return one page of the stored images whose public_id starts with prefix as
+        {"resources": [{"public_id": ..., "created_at": ...}], "next_cursor": ...}
+        """
+
+    def verify_upload(self, upload: SignedUpload, folder: str) -> str:
+        """
+        Check the response signature of a direct upload and return its URL.
+        """
+        if not upload.public_id.startswith(f"{folder}/"):
+            raise HTTPException(status_code=400, detail=f"Image {upload.public_id} was not uploaded to {folder}")
+
+        if not self.verify_signature(upload):
+            raise HTTPException(status_code=400, detail=f"Invalid upload signature for {upload.public_id}")
+
+        # The URL is not covered by the signature, so it must point at the signed asset
+        if not upload.secure_url.startswith(self.asset_url_prefix(upload)):
+            raise HTTPException(status_code=400, detail=f"Image URL does not match {upload.public_id}")
+
+        return upload.secure_url
+
+
+@lru_cache
+def get_storage() -> StorageBackend:
+    if MEDIA_STORAGE == "local":
+        from app.utils.local_storage import LocalStorage
+        return LocalStorage()
+    if MEDIA_STORAGE == "cloudinary":
+        from app.utils.cloudinary import CloudinaryStorage
+        return CloudinaryStorage()
+    raise ValueError(f"Unknown MEDIA_STORAGE backend: {MEDIA_STORAGE}")
+
+
+def parse_signed_uploads(images: str, folder: str) -> List[str]:
+    """
+    Parse a JSON list of direct-upload results from a form field and
+    return the verified image URLs.
+    """
+    try:
+        uploads = signed_uploads_adapter.validate_json(images)
+    except ValidationError:
+        raise HTTPException(status_code=422, detail="images must be a JSON list of signed uploads")
+
+    storage = get_storage()
+    return [storage.verify_upload(upload, folder) for upload in uploads]
+
+
+def parse_signed_upload(image: str, folder: str) -> str:
+    try:
+        upload = SignedUpload.model_validate_json(image)
+    except ValidationError:
+        raise HTTPException(status_code=422, detail="Image must be a signed upload")
+
+    return get_storage().verify_upload(upload, folder)
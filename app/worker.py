@@ -0,0 +1,12 @@
+import os
+from app import config  # noqa: F401  Loads .env before WS_PER_MESSAGE_DEFLATE is read below
+from uvicorn.workers import UvicornWorker as BaseUvicornWorker
+
+# Run with: gunicorn app.main:app -k app.worker.UvicornWorker
+# WS_PER_MESSAGE_DEFLATE=false turns off permessage-deflate for notification sockets;
+# otherwise it is negotiated with every client that offers it.
+class UvicornWorker(BaseUvicornWorker):
+    CONFIG_KWARGS = {
+        **BaseUvicornWorker.CONFIG_KWARGS,
+        "ws_per_message_deflate": os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() == "true",
+    }
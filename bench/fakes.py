@@ -0,0 +1,94 @@
+"""
+Local stand-ins for the external services the API talks to, so benchmarks
+measure this code rather than the network:
+
+- Cloudinary: the app's own local storage backend (MEDIA_STORAGE=local)
+- the email webhook: EmailWebhook, a tiny HTTP server that accepts every POST
+- Google sign-in: install_google_fakes(), which accepts "fake-google:<email>" tokens
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_GOOGLE_PREFIX = "fake-google:"
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.server.received += 1
+        body = b'{"status": "sent"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class EmailWebhook:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.server = ThreadingHTTPServer((host, port), _WebhookHandler)
+        self.server.daemon_threads = True
+        self.server.received = 0
+        self.thread = threading.Thread(target=self.server.serve_forever, name="email-webhook", daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/send"
+
+    @property
+    def received(self):
+        return self.server.received
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _profile_for(token: str):
+    if not token.startswith(FAKE_GOOGLE_PREFIX):
+        raise ValueError("Invalid Google Token")
+    email = token[len(FAKE_GOOGLE_PREFIX):]
+    return {
+        "googleId": f"google-{email}",
+        "email": email,
+        "name": email.split("@")[0],
+        "profileImage": None,
+    }
+
+
+class _FakeCredentials:
+    def __init__(self, email: str):
+        self.id_token = {"email": email, "name": email.split("@")[0], "picture": None}
+
+
+class FakeFlow:
+    """Stands in for google_auth_oauthlib's Flow; fetch_token never leaves the process."""
+
+    def __init__(self):
+        self.credentials = None
+
+    def authorization_url(self, **params):
+        return "http://127.0.0.1/fake-google/authorize?" + "&".join(f"{key}={value}" for key, value in params.items()), "state"
+
+    def fetch_token(self, code: str, **kwargs):
+        # The code doubles as the signed-in email so callbacks can log in distinct users
+        self.credentials = _FakeCredentials(code if "@" in code else f"{code}@bench.example.com")
+
+
+def install_google_fakes():
+    # Must run after the app is imported; patches the names the user routes call
+    import app.routes.user as user_routes
+
+    async def verify_google_token(token: str):
+        return _profile_for(token)
+
+    user_routes.verify_google_token = verify_google_token
+    user_routes.init_oauth_flow = FakeFlow
@@ -0,0 +1,164 @@
+"""
+Shared plumbing for the benchmark scenarios: launching a seeded server,
+logging in, and summarizing latencies as JSON.
+"""
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+import httpx
+
+from bench.fakes import EmailWebhook
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+Server = namedtuple("Server", ["base_url", "manifest", "process", "webhook"])
+
+# A 1x1 transparent PNG for upload benchmarks
+PNG_BYTES = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c63000100000500010d0a2db40000000049454e44ae426082"
+)
+
+
+def add_server_arguments(parser):
+    parser.add_argument("--mongo-uri", default="mongodb://127.0.0.1:27017")
+    parser.add_argument("--allow-remote", action="store_true", help="allow seeding a MongoDB that isn't on this machine")
+    parser.add_argument("--in-memory", action="store_true", help="use mongomock-motor instead of MongoDB")
+    parser.add_argument("--reset", action="store_true", help="drop the app's databases before seeding")
+    parser.add_argument("--volume", action="append", default=[], metavar="COLLECTION=N", help="override a seed volume, e.g. blogs=5000")
+    parser.add_argument("--out", help="write the JSON report here as well as to stdout")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def parse_volumes(pairs):
+    volumes = {}
+    for pair in pairs:
+        name, _, count = pair.partition("=")
+        volumes[name] = int(count)
+    return volumes
+
+
+@contextmanager
+def launch_server(args, disposable: int = 0, env: dict = None):
+    """
+    Start bench.server in a subprocess against a seeded database, with the
+    email webhook fake running here. Yields a Server.
+    """
+    if not args.in_memory and urlparse(args.mongo_uri).hostname not in LOCAL_HOSTS and not args.allow_remote:
+        sys.exit(f"Refusing to seed {args.mongo_uri}; pass --allow-remote if that is really a scratch database")
+
+    webhook = EmailWebhook().start()
+    port = free_port()
+    manifest_path = os.path.join(tempfile.mkdtemp(prefix="bench-"), "manifest.json")
+    command = [
+        sys.executable, "-m", "bench.server",
+        "--port", str(port),
+        "--manifest", manifest_path,
+        "--mongo-uri", args.mongo_uri,
+        "--volumes", json.dumps(parse_volumes(args.volume)),
+        "--disposable", str(disposable),
+        "--email-url", webhook.url,
+    ]
+    if args.in_memory:
+        command.append("--in-memory")
+    if args.reset:
+        command.append("--reset")
+
+    process = subprocess.Popen(command, cwd=ROOT, env={**os.environ, **(env or {})})
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_ready(process, base_url)
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        yield Server(base_url, manifest, process, webhook)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        webhook.stop()
+
+
+def _wait_until_ready(process, base_url: str, timeout: float = 300):
+    # Seeding large volumes takes a while; the server only listens once it's done
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"Benchmark server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    sys.exit("Benchmark server did not start in time")
+
+
+async def login_admin(client: httpx.AsyncClient, manifest: dict):
+    response = await client.post("/api/admin/login", json=manifest["admin"])
+    response.raise_for_status()
+    return response.json()
+
+
+async def login_user(client: httpx.AsyncClient, manifest: dict):
+    response = await client.post("/api/users/login", data=manifest["user"])
+    response.raise_for_status()
+    return response.json()["access_token"], response.cookies.get("refresh_token")
+
+
+def percentiles(samples):
+    """p50/p95/p99/mean/max in milliseconds."""
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None, "max_ms": None}
+    if len(samples) == 1:
+        cuts = [samples[0]] * 99
+    else:
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p95_ms": round(cuts[94] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3),
+    }
+
+
+def report_meta(**extra):
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        **extra,
+    }
+
+
+def write_report(report: dict, path: str = None):
+    text = json.dumps(report, indent=2, default=str)
+    if path:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+    print(text)
@@ -0,0 +1,353 @@
+"""
+End-to-end HTTP benchmark of every API route against a seeded database.
+
+    python -m bench.http_suite [--concurrency 16] [--requests 200] [--routes REGEX]
+                               [--in-memory | --mongo-uri URI] [--reset] [--volume blogs=5000]
+                               [--out results.json] [--compare baseline.json]
+
+Starts the API in a subprocess with local fakes for Cloudinary, the email
+webhook and Google (see bench/fakes.py), seeds it, then drives each route
+in turn at a fixed concurrency. Prints a JSON report with throughput and
+p50/p95/p99 per route; --compare prints the change against an earlier one.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import re
+import sys
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+import httpx
+
+from bench.harness import (
+    PNG_BYTES, add_server_arguments, launch_server, login_admin, login_user, percentiles, report_meta, write_report,
+)
+
+# Routes deliberately not driven, with the reason; they change how the server behaves for every later scenario
+EXCLUDED = {
+    "POST /api/admin/diagnostics/memory/tracemalloc/start": "tracing slows every later request",
+    "POST /api/admin/diagnostics/memory/tracemalloc/stop": "paired with tracemalloc/start",
+    "POST /api/admin/diagnostics/memory/snapshots": "needs tracemalloc running",
+    "GET /api/admin/diagnostics/memory/snapshots/{snapshot_id}/diff": "needs tracemalloc running",
+}
+
+IMAGE_FOLDERS = ["blogs", "events", "insights", "announcements", "users"]
+SNAPSHOT_DATASETS = ["services", "blogs", "events", "insights", "announcements"]
+
+
+class Scenario:
+    def __init__(self, method: str, route: str, build=None, auth: str = None):
+        self.method = method
+        self.route = route
+        # build(i) -> (url, httpx request kwargs) for the i-th request
+        self.build = build or (lambda i: (route, {}))
+        self.auth = auth
+
+    @property
+    def name(self):
+        return f"{self.method} {self.route}"
+
+
+def _pick(items, i):
+    return items[i % len(items)]
+
+
+def build_scenarios(ctx):
+    ids, disposable, uploads = ctx["ids"], ctx["disposable"], ctx["uploads"]
+    admin = {"Authorization": f"Bearer {ctx['admin_token']}"}
+    user = {"Authorization": f"Bearer {ctx['user_token']}"}
+    run = ctx["run_id"]
+
+    def form(**fields):
+        return {"data": fields}
+
+    def blog_form(i):
+        return form(title=f"Bench blog {run}-{i}", description="Benchmark", content="Benchmark content " * 20, category="sales",
+                    tags="bench,load", status="published", slug=f"bench-{run}-{i}", images=uploads["blogs"])
+
+    def event_form(i):
+        return form(event_name=f"Bench event {i}", event_date="2030-01-01T10:00:00", event_location="Nairobi",
+                    event_description="Benchmark", images=uploads["events"], event_link="https://example.com")
+
+    def insight_form(i):
+        return form(insight_title=f"Bench insight {i}", insight_date="2030-01-01T10:00:00", insight_content="Benchmark",
+                    author="Bench", images=uploads["insights"], insight_link="https://example.com")
+
+    def announcement_form(i):
+        return form(title=f"Bench announcement {i}", content="Benchmark", announcement_date="2030-01-01T10:00:00",
+                    tags="bench", link="https://example.com", images=uploads["announcements"])
+
+    def by_id(template, kind, pool=ids, **kwargs):
+        placeholder = re.search(r"\{(\w+)\}", template).group(0)
+        return lambda i: (template.replace(placeholder, _pick(pool[kind], i)), dict(kwargs))
+
+    return [
+        # app/main.py
+        Scenario("GET", "/"),
+        Scenario("GET", "/api/usage"),
+        Scenario("GET", "/api/usage/series"),
+        Scenario("POST", "/api/reset_usage", lambda i: ("/api/reset_usage", {"json": {"endpoint": "/bench"}})),
+        Scenario("POST", "/api/reset_all_usage"),
+
+        # Blogs
+        Scenario("GET", "/api/blogs/", lambda i: ("/api/blogs/", {"params": {"limit": 10, "skip": (i * 10) % max(len(ids["blogs"]), 1)}})),
+        Scenario("POST", "/api/blogs/", lambda i: ("/api/blogs/", blog_form(i))),
+        Scenario("PUT", "/api/blogs/{blog_id}", lambda i: (f"/api/blogs/{_pick(ids['blogs'], i)}", blog_form(i))),
+        Scenario("DELETE", "/api/blogs/{blog_id}", by_id("/api/blogs/{blog_id}", "blogs", disposable)),
+
+        # Events
+        Scenario("GET", "/api/events/", lambda i: ("/api/events/", {"params": {"limit": 10, "skip": (i * 10) % max(len(ids["events"]), 1)}})),
+        Scenario("GET", "/api/events/{event_id}", by_id("/api/events/{event_id}", "events")),
+        Scenario("POST", "/api/events/", lambda i: ("/api/events/", event_form(i))),
+        Scenario("PUT", "/api/events/{event_id}", lambda i: (f"/api/events/{_pick(ids['events'], i)}", event_form(i))),
+        Scenario("DELETE", "/api/events/{event_id}", by_id("/api/events/{event_id}", "events", disposable)),
+
+        # Insights
+        Scenario("GET", "/api/insights/", lambda i: ("/api/insights/", {"params": {"limit": 10, "skip": (i * 10) % max(len(ids["insights"]), 1)}})),
+        Scenario("POST", "/api/insights/", lambda i: ("/api/insights/", insight_form(i))),
+        Scenario("PUT", "/api/insights/{insight_id}", lambda i: (f"/api/insights/{_pick(ids['insights'], i)}", insight_form(i))),
+        Scenario("DELETE", "/api/insights/{insight_id}", by_id("/api/insights/{insight_id}", "insights", disposable)),
+
+        # Announcements
+        Scenario("GET", "/api/announcements/", lambda i: ("/api/announcements/", {"params": {"limit": 10}})),
+        Scenario("POST", "/api/announcements/", lambda i: ("/api/announcements/", announcement_form(i))),
+        Scenario("PUT", "/api/announcements/{announcement_id}",
+                 lambda i: (f"/api/announcements/{_pick(ids['announcements'], i)}", form(title=f"Updated {i}"))),
+        Scenario("DELETE", "/api/announcements/{announcement_id}", by_id("/api/announcements/{announcement_id}", "announcements", disposable)),
+
+        # Contact messages
+        Scenario("POST", "/api/contact/", lambda i: ("/api/contact/", {"json": {
+            "name": f"Bench {i}", "email": f"bench{i}@bench.example.com", "message": "Benchmark message", "category": "sales"}})),
+        Scenario("GET", "/api/contact/", lambda i: ("/api/contact/", {"params": {"limit": 10, "skip": (i * 10) % max(len(ids["messages"]), 1)}})),
+        Scenario("GET", "/api/contact/unread_count"),
+        Scenario("DELETE", "/api/contact/{message_id}", by_id("/api/contact/{message_id}", "messages", disposable)),
+
+        # Services
+        Scenario("GET", "/api/services/"),
+        Scenario("POST", "/api/services/", lambda i: ("/api/services/", {"headers": admin, "json": {
+            "title": f"Bench service {i}", "description": "Benchmark", "imageUrls": []}})),
+        Scenario("DELETE", "/api/services/{service_id}", by_id("/api/services/{service_id}", "services", disposable, headers=admin)),
+
+        # Batch: the landing page's reads in one request
+        Scenario("POST", "/api/batch", lambda i: ("/api/batch", {"json": {"requests": [
+            {"path": "/api/services/"}, {"path": "/api/blogs/", "params": {"limit": 3}}, {"path": "/api/events/", "params": {"limit": 3}},
+            {"path": "/api/insights/", "params": {"limit": 3}}, {"path": "/api/announcements/", "params": {"limit": 3}}]}})),
+
+        # Snapshots: pre-rendered reads served from disk
+        Scenario("GET", "/api/snapshots/{dataset}", lambda i: (f"/api/snapshots/{SNAPSHOT_DATASETS[i % len(SNAPSHOT_DATASETS)]}", {})),
+        Scenario("GET", "/api/snapshots/{dataset}/{item_id}", lambda i: (f"/api/snapshots/blogs/{_pick(ids['blogs'], i)}", {})),
+
+        # Users
+        Scenario("POST", "/api/users/register", lambda i: ("/api/users/register", form(
+            name=f"Bench {i}", email=f"register-{run}-{i}@bench.example.com", password="bench-password"))),
+        Scenario("POST", "/api/users/login", lambda i: ("/api/users/login", {"data": ctx["manifest"]["user"]})),
+        Scenario("GET", "/api/users/profile", lambda i: ("/api/users/profile", {"headers": user})),
+        Scenario("PUT", "/api/users/details/{user_id}",
+                 lambda i: (f"/api/users/details/{_pick(ids['users'], i)}", form(bio=f"Updated {i}", profile_picture=uploads["user"]))),
+        Scenario("DELETE", "/api/users/{user_id}", by_id("/api/users/{user_id}", "users", disposable)),
+        Scenario("POST", "/api/users/logout"),
+        Scenario("POST", "/api/users/refresh", lambda i: ("/api/users/refresh", {"cookies": {"refresh_token": ctx["user_refresh"]}})),
+        Scenario("POST", "/api/usersregister/google",
+                 lambda i: ("/api/usersregister/google", {"params": {"token": f"fake-google:google-{run}-{i}@bench.example.com"}})),
+        Scenario("GET", "/api/users/google-login"),
+        Scenario("GET", "/api/users/google-callback", lambda i: ("/api/users/google-callback", {"params": {"code": f"callback-{run}-{i}"}})),
+
+        # Admin
+        Scenario("POST", "/api/admin/create", lambda i: ("/api/admin/create", {"json": {
+            "name": f"Bench {i}", "email": f"admin-{run}-{i}@bench.example.com", "password": "bench-password", "phone": "+254700000000"}})),
+        Scenario("POST", "/api/admin/login", lambda i: ("/api/admin/login", {"json": ctx["manifest"]["admin"]})),
+        Scenario("POST", "/api/admin/refresh", lambda i: ("/api/admin/refresh", {"headers": {"Authorization": f"Bearer {ctx['admin_refresh']}"}})),
+        Scenario("GET", "/api/admin/protected", lambda i: ("/api/admin/protected", {"headers": admin})),
+        Scenario("POST", "/api/admin/messages/{message_id}/respond",
+                 lambda i: (f"/api/admin/messages/{_pick(ids['messages'], i)}/respond", {"json": {"response": "Thanks for reaching out"}})),
+        Scenario("GET", "/api/admin/users"),
+        Scenario("PATCH", "/api/admin/users/{user_id}", by_id("/api/admin/users/{user_id}", "users", json={"is_active": True})),
+        Scenario("GET", "/api/admin/dashboard-stats"),
+        Scenario("GET", "/api/admin/projects", lambda i: ("/api/admin/projects", {"headers": admin})),
+        Scenario("GET", "/api/admin/projects/completion", lambda i: ("/api/admin/projects/completion", {"headers": admin})),
+        Scenario("GET", "/api/admin/projects/{project_id}", by_id("/api/admin/projects/{project_id}", "projects", headers=admin)),
+        Scenario("POST", "/api/admin/projects", lambda i: ("/api/admin/projects", {"headers": admin, "json": {"name": f"Bench project {i}"}})),
+        Scenario("PATCH", "/api/admin/projects/{project_id}",
+                 by_id("/api/admin/projects/{project_id}", "projects", headers=admin, json={"description": "Benchmark"})),
+        Scenario("DELETE", "/api/admin/projects/{project_id}", by_id("/api/admin/projects/{project_id}", "projects", disposable, headers=admin)),
+        Scenario("POST", "/api/admin/assets/gc", lambda i: ("/api/admin/assets/gc", {"headers": admin, "params": {"dry_run": True}})),
+        Scenario("GET", "/api/admin/assets/gc", lambda i: ("/api/admin/assets/gc", {"headers": admin})),
+        Scenario("GET", "/api/admin/diagnostics/mongo", lambda i: ("/api/admin/diagnostics/mongo", {"headers": admin})),
+        Scenario("GET", "/api/admin/diagnostics/loop", lambda i: ("/api/admin/diagnostics/loop", {"headers": admin})),
+        Scenario("GET", "/api/admin/diagnostics/load", lambda i: ("/api/admin/diagnostics/load", {"headers": admin})),
+        Scenario("GET", "/api/admin/diagnostics/breakers", lambda i: ("/api/admin/diagnostics/breakers", {"headers": admin})),
+        Scenario("GET", "/api/admin/diagnostics/memory", lambda i: ("/api/admin/diagnostics/memory", {"headers": admin})),
+        Scenario("GET", "/api/admin/diagnostics/memory/objects", lambda i: ("/api/admin/diagnostics/memory/objects", {"headers": admin})),
+        Scenario("GET", "/api/admin/profiling", lambda i: ("/api/admin/profiling", {"headers": admin})),
+        Scenario("PUT", "/api/admin/profiling", lambda i: ("/api/admin/profiling", {"headers": admin, "json": {"sample_rate": 0}})),
+        Scenario("DELETE", "/api/admin/profiling", lambda i: ("/api/admin/profiling", {"headers": admin})),
+        Scenario("POST", "/api/admin/profiling/token", lambda i: ("/api/admin/profiling/token", {"headers": admin})),
+        Scenario("GET", "/api/admin/profiling/profiles/{profile_id}", lambda i: ("/api/admin/profiling/profiles/missing", {"headers": admin})),
+
+        # System and notifications
+        Scenario("GET", "/api/system/metrics"),
+        Scenario("GET", "/api/system/metrics/history"),
+        Scenario("GET", "/ws/notifications/stats", lambda i: ("/ws/notifications/stats", {"headers": admin})),
+        Scenario("GET", "/metrics"),
+
+        # Uploads and local media (the Cloudinary stand-in)
+        Scenario("POST", "/api/uploads/signature", lambda i: ("/api/uploads/signature", {"json": {"folder": _pick(IMAGE_FOLDERS, i)}})),
+        Scenario("POST", "/media/image/upload", lambda i: (ctx["upload_url"], {
+            "data": ctx["upload_fields"], "files": {"file": ("bench.png", PNG_BYTES, "image/png")}})),
+        Scenario("GET", "/media/image/upload/{path}", lambda i: (ctx["media_path"], {})),
+    ]
+
+
+async def signed_upload(client: httpx.AsyncClient, folder: str):
+    # Goes through the real signature and upload routes, as the frontend does
+    signature = (await client.post("/api/uploads/signature", json={"folder": folder})).json()
+    fields = {key: str(value) for key, value in signature.items() if key not in ("upload_url", "cloud_name")}
+    response = await client.post(signature["upload_url"], data=fields, files={"file": ("bench.png", PNG_BYTES, "image/png")})
+    response.raise_for_status()
+    uploaded = response.json()
+    return signature, {key: uploaded[key] for key in ("public_id", "version", "signature", "secure_url")}
+
+
+async def prepare(client: httpx.AsyncClient, manifest: dict):
+    tokens = await login_admin(client, manifest)
+    user_token, user_refresh = await login_user(client, manifest)
+
+    uploads = {}
+    for folder in IMAGE_FOLDERS:
+        signature, upload = await signed_upload(client, folder)
+        uploads[folder] = json.dumps([upload])
+    uploads["user"] = json.dumps(upload)
+
+    # A separate upload no document references, so deletes never remove it
+    signature, served = await signed_upload(client, "blogs")
+    return {
+        "manifest": manifest,
+        "ids": manifest["ids"],
+        "disposable": manifest["disposable"],
+        "admin_token": tokens["access_token"],
+        "admin_refresh": tokens["refresh_token"],
+        "user_token": user_token,
+        "user_refresh": user_refresh,
+        "uploads": uploads,
+        "upload_url": signature["upload_url"],
+        "upload_fields": {key: str(value) for key, value in signature.items() if key not in ("upload_url", "cloud_name")},
+        "media_path": urlparse(served["secure_url"]).path,
+        "run_id": str(int(time.time())),
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, start: int, count: int, concurrency: int):
+    latencies = []
+    statuses = Counter()
+    indices = itertools.count(start)
+
+    async def worker():
+        for i in indices:
+            if i >= start + count:
+                return
+            url, kwargs = scenario.build(i)
+            began = time.perf_counter()
+            try:
+                response = await client.request(scenario.method, url, **kwargs)
+                statuses[str(response.status_code)] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - began)
+
+    began = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - began
+
+
+async def run_suite(base_url: str, manifest: dict, args):
+    pattern = re.compile(args.routes) if args.routes else None
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        ctx = await prepare(client, manifest)
+        scenarios = build_scenarios(ctx)
+        documented = await documented_routes(client)
+
+        results = {}
+        for scenario in scenarios:
+            if pattern and not pattern.search(scenario.name):
+                continue
+            await run_scenario(client, scenario, 0, args.warmup, args.concurrency)
+            latencies, statuses, elapsed = await run_scenario(client, scenario, args.warmup, args.requests, args.concurrency)
+            errors = sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 400)
+            results[scenario.name] = {
+                "requests": len(latencies),
+                "errors": errors,
+                "statuses": dict(statuses),
+                "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+                **percentiles(latencies),
+            }
+            print(f"{scenario.name:70} {results[scenario.name]['throughput_rps']:>9} rps  p50 {results[scenario.name]['p50_ms']}ms"
+                  f"  p99 {results[scenario.name]['p99_ms']}ms  errors {errors}", file=sys.stderr)
+
+    covered = {scenario.name for scenario in scenarios}
+    uncovered = sorted(name for name in documented if name not in covered and name not in EXCLUDED)
+    return results, uncovered
+
+
+async def documented_routes(client: httpx.AsyncClient):
+    # Every route in the OpenAPI schema should have a scenario or an entry in EXCLUDED
+    schema = (await client.get("/openapi.json")).json()
+    return {
+        f"{method.upper()} {path}"
+        for path, operations in schema["paths"].items()
+        for method in operations
+    }
+
+
+def compare(report: dict, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nAgainst {baseline['meta'].get('commit')} ({baseline_path}):", file=sys.stderr)
+    for name, result in report["routes"].items():
+        before = baseline["routes"].get(name)
+        if not before or not before.get("p50_ms") or not result.get("p50_ms"):
+            continue
+        p50 = (result["p50_ms"] / before["p50_ms"] - 1) * 100
+        p99 = (result["p99_ms"] / before["p99_ms"] - 1) * 100
+        rps = (result["throughput_rps"] / before["throughput_rps"] - 1) * 100
+        print(f"{name:70} rps {rps:+6.1f}%  p50 {p50:+6.1f}%  p99 {p99:+6.1f}%", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_server_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per route")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per route first")
+    parser.add_argument("--routes", help="only routes whose 'METHOD /path' matches this regex")
+    parser.add_argument("--compare", help="earlier report to compare against")
+    args = parser.parse_args()
+
+    # Delete scenarios consume one seeded document per request
+    with launch_server(args, disposable=args.warmup + args.requests) as server:
+        routes, uncovered = asyncio.run(run_suite(server.base_url, server.manifest, args))
+        emails = server.webhook.received
+
+    report = {
+        "meta": report_meta(
+            concurrency=args.concurrency,
+            requests_per_route=args.requests,
+            warmup_per_route=args.warmup,
+            database="in-memory" if args.in_memory else "mongodb",
+            volumes=server.manifest["volumes"],
+            emails_sent=emails,
+        ),
+        "routes": routes,
+        "uncovered": uncovered,
+        "excluded": EXCLUDED,
+    }
+    write_report(report, args.out)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
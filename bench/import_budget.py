@@ -0,0 +1,111 @@
+"""
+Check that importing the app stays within a cold-start budget.
+
+    python -m bench.import_budget [--max-ratio 2] [--budget-ms 1500] [--runs 5]
+
+Imports app.main in fresh interpreters with -X importtime and fails when
+the fastest run is over budget, or when any dependency that should load
+lazily on first use shows up at startup. The budget is relative to the
+framework the app is built on: the same run times importing fastapi and
+motor on their own, so a slower machine raises both numbers together.
+--budget-ms adds an absolute cap as well. Exits non-zero on failure so
+it can gate CI.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# Only needed by specific routes or background work; must not load at startup
+LAZY_MODULES = [
+    "googleapiclient",
+    "google_auth_oauthlib",
+    "google.auth.transport.requests",
+    "google.oauth2",
+    "oauthlib",
+    "requests",
+    "passlib",
+    "cloudinary",
+    "psutil",
+]
+
+# What every startup pays before any app code: the baseline the budget is relative to
+BASELINE_MODULES = ["fastapi", "motor.motor_asyncio"]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(code: str = "import app.main"):
+    # Background monitors are irrelevant to import cost
+    env = {**os.environ, "LOOP_MONITOR": "off"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"{code} failed:\n{result.stderr}")
+
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports[name.strip()] = (int(self_us), int(cumulative_us))
+    return imports
+
+
+def baseline_ms():
+    # Imported in order in one interpreter, so each cumulative time excludes what the earlier ones loaded
+    imports = measure("import " + ", ".join(BASELINE_MODULES))
+    return sum(imports[module][1] for module in BASELINE_MODULES) / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    # app.main measures about 1.5x the fastapi + motor baseline; a regression that adds
+    # another half of the framework's own import time fails
+    parser.add_argument("--max-ratio", type=float, default=float(os.getenv("IMPORT_BUDGET_RATIO", "2")))
+    # Optional absolute cap, for a CI machine whose speed is known
+    parser.add_argument("--budget-ms", type=float, default=os.getenv("IMPORT_BUDGET_MS"))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    # The first run warms the OS file cache; keep the fastest. Interleaved so load on
+    # the machine affects the baseline and the app alike.
+    runs, baselines = [], []
+    for _ in range(args.runs):
+        baselines.append(baseline_ms())
+        runs.append(measure())
+    imports = min(runs, key=lambda run: run["app.main"][1])
+    total_ms = imports["app.main"][1] / 1000
+    baseline = min(baselines)
+    budget_ms = baseline * args.max_ratio
+    if args.budget_ms is not None:
+        budget_ms = min(budget_ms, float(args.budget_ms))
+
+    print(
+        f"import app.main: {total_ms:.1f}ms, {total_ms / baseline:.2f}x the {baseline:.1f}ms fastapi + motor "
+        f"baseline (budget {budget_ms:.0f}ms, best of {args.runs})"
+    )
+    print("Slowest imports by self time:")
+    for name, (self_us, cumulative_us) in sorted(imports.items(), key=lambda item: item[1][0], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f}ms  {cumulative_us / 1000:8.1f}ms  {name}")
+
+    failures = []
+    if total_ms > budget_ms:
+        failures.append(f"startup import took {total_ms:.1f}ms, over the {budget_ms:.0f}ms budget")
+    for module in LAZY_MODULES:
+        if module in imports:
+            failures.append(f"{module} is imported at startup; import it where it is used")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
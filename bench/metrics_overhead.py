@@ -0,0 +1,64 @@
+"""
+Measure the per-request cost of recording metrics.
+
+    python -m bench.metrics_overhead [--iterations N]
+
+Reports the time spent in MetricsRegistry.observe_request plus the in-flight
+gauge updates, i.e. everything the usage middleware adds per request apart
+from the clock reads, which are reported separately.
+"""
+import argparse
+import json
+import random
+import time
+import timeit
+
+from app.utils.metrics import MetricsRegistry
+
+ROUTES = [
+    "/",
+    "/api/blogs/",
+    "/api/blogs/{blog_id}",
+    "/api/events/",
+    "/api/events/{event_id}",
+    "/api/contact/",
+    "/api/services/",
+    "other",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    registry = MetricsRegistry()
+    samples = [(random.choice(ROUTES), random.choice((200, 200, 200, 404, 500)), random.expovariate(20)) for _ in range(1024)]
+
+    def record():
+        for route, status, duration in samples:
+            registry.in_flight["GET"] += 1
+            registry.in_flight["GET"] -= 1
+            registry.observe_request(route, "GET", status, duration)
+
+    def clock():
+        for _ in samples:
+            time.perf_counter()
+            time.perf_counter()
+
+    rounds = max(args.iterations // len(samples), 1)
+    requests = rounds * len(samples)
+    record_seconds = min(timeit.repeat(record, number=rounds, repeat=3))
+    clock_seconds = min(timeit.repeat(clock, number=rounds, repeat=3))
+    render_seconds = min(timeit.repeat(registry.render, number=100, repeat=3)) / 100
+
+    print(json.dumps({
+        "requests": requests,
+        "record_us_per_request": record_seconds / requests * 1e6,
+        "clock_us_per_request": clock_seconds / requests * 1e6,
+        "render_ms": render_seconds * 1e3,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
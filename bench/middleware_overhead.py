@@ -0,0 +1,115 @@
+"""
+Measure the per-request cost of the usage middleware on a trivial route.
+
+    python -m bench.middleware_overhead [--requests N] [--concurrency C]
+
+Calls a FastAPI app serving GET / (like the real root route) directly over
+ASGI, so no sockets or HTTP parsing are involved, in three variants: no
+middleware, the usage hook behind BaseHTTPMiddleware (how it used to be
+installed) and the usage hook in the pure ASGI RequestPipeline. Reports
+microseconds per request and the overhead of each over the bare app.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI
+
+from app.routes.usage import api_usage, usage_minutes, usage_tracker
+from app.utils.middleware import RequestPipeline
+
+
+def build_app(variant: str):
+    app = FastAPI()
+
+    @app.get("/")
+    def root():
+        return {"status": "ok"}
+
+    if variant == "base_http":
+        @app.middleware("http")
+        async def track(request, call_next):
+            state = usage_tracker.start(request.scope)
+            status = 500
+            start = time.perf_counter()
+            try:
+                response = await call_next(request)
+                status = response.status_code
+                return response
+            finally:
+                usage_tracker.finish(request.scope, state, status, time.perf_counter() - start)
+    elif variant == "asgi":
+        app.add_middleware(RequestPipeline, hooks=[usage_tracker])
+    return app
+
+
+def http_scope():
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/",
+        "raw_path": b"/",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"accept", b"application/json")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+
+
+async def drive(app, requests: int, concurrency: int):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def worker(count: int):
+        for _ in range(count):
+            await app(http_scope(), receive, send)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def measure(variant: str, requests: int, concurrency: int, rounds: int):
+    app = build_app(variant)
+    # Builds the middleware stack and warms the threadpool
+    await drive(app, 1000, concurrency)
+    best = min([await drive(app, requests, concurrency) for _ in range(rounds)])
+    api_usage.clear()
+    usage_minutes.clear()
+    return best / (requests // concurrency * concurrency) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--rounds", type=int, default=3, help="best of this many runs per variant")
+    args = parser.parse_args()
+
+    async def run():
+        return {
+            variant: await measure(variant, args.requests, args.concurrency, args.rounds)
+            for variant in ("none", "base_http", "asgi")
+        }
+
+    results = asyncio.run(run())
+    print(json.dumps({
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "us_per_request": {variant: round(us, 2) for variant, us in results.items()},
+        "overhead_us": {
+            variant: round(results[variant] - results["none"], 2) for variant in ("base_http", "asgi")
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
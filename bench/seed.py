@@ -0,0 +1,198 @@
+"""
+Seed the app's databases with synthetic documents shaped like the ones
+the crud layer writes. Works against Motor or an in-memory Motor stand-in.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+
+# Collection -> default number of documents
+DEFAULT_VOLUMES = {
+    "users": 1000,
+    "messages": 2000,
+    "blogs": 500,
+    "events": 200,
+    "insights": 200,
+    "announcements": 200,
+    "projects": 100,
+    "services": 20,
+}
+
+# Collection -> (database, collection) as used by app/crud
+COLLECTIONS = {
+    "users": ("users_database", "users"),
+    "admins": ("admins_database", "admins"),
+    "messages": ("messages_database", "messages"),
+    "blogs": ("blogs_database", "blogs"),
+    "events": ("events_database", "events"),
+    "insights": ("insights_database", "insights"),
+    "announcements": ("announcements_database", "announcements"),
+    "projects": ("projects_database", "projects"),
+    "services": ("services_database", "services"),
+}
+
+BENCH_PASSWORD = "bench-password"
+ADMIN_EMAIL = "admin@bench.example.com"
+USER_EMAIL = "user@bench.example.com"
+CATEGORIES = ["sales", "support", "partnerships", "careers"]
+WORDS = "fast api mongo cloud notify event insight growth market design launch scale team data".split()
+
+
+def _text(rng: random.Random, words: int):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _image(media_base_url: str, folder: str, index: int):
+    # Local-storage URLs for files that don't exist, so deletes exercise the storage path cheaply
+    return f"{media_base_url}/media/image/upload/v1/{folder}/seed-{index}.jpg"
+
+
+def _documents(kind: str, count: int, rng: random.Random, password_hash: str, media_base_url: str, offset: int = 0):
+    now = datetime.now(timezone.utc)
+    for i in range(offset, offset + count):
+        created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+        if kind == "users":
+            yield {
+                "name": f"Bench User {i}",
+                "email": f"user{i}@bench.example.com",
+                "password": password_hash,
+                "phone": f"+2547{i:08d}",
+                "profile_picture": _image(media_base_url, "users", i),
+                "bio": _text(rng, 12),
+                "googleId": None,
+                "role": "user",
+                "is_active": rng.random() > 0.1,
+            }
+        elif kind == "messages":
+            yield {
+                "name": f"Sender {i}",
+                "email": f"sender{i}@bench.example.com",
+                "message": _text(rng, 40),
+                "category": rng.choice(CATEGORIES),
+                "read": rng.random() > 0.3,
+            }
+        elif kind == "blogs":
+            yield {
+                "title": f"Blog {i} {_text(rng, 4)}",
+                "description": _text(rng, 20),
+                "content": _text(rng, 400),
+                "category": rng.choice(CATEGORIES),
+                "tags": rng.sample(WORDS, 3),
+                "status": rng.choice(["draft", "published", "archived"]),
+                "slug": f"blog-{i}",
+                "link": None,
+                "images": [_image(media_base_url, "blogs", i)],
+                "created_at": created_at,
+            }
+        elif kind == "events":
+            yield {
+                "event_name": f"Event {i}",
+                "event_date": created_at + timedelta(days=30),
+                "event_location": "Nairobi",
+                "event_description": _text(rng, 60),
+                "images": [_image(media_base_url, "events", i)],
+                "event_link": "https://example.com/event",
+                "created_at": created_at,
+            }
+        elif kind == "insights":
+            yield {
+                "insight_title": f"Insight {i}",
+                "insight_date": created_at,
+                "insight_content": _text(rng, 200),
+                "author": f"Author {i % 20}",
+                "images": [_image(media_base_url, "insights", i)],
+                "insight_link": "https://example.com/insight",
+                "created_at": created_at,
+            }
+        elif kind == "announcements":
+            yield {
+                "title": f"Announcement {i}",
+                "content": _text(rng, 80),
+                "announcement_date": created_at,
+                "tags": rng.sample(WORDS, 2),
+                "images": [_image(media_base_url, "announcements", i)],
+                "link": "https://example.com/announcement",
+                "created_at": created_at,
+            }
+        elif kind == "projects":
+            yield {
+                "name": f"Project {i}",
+                "description": _text(rng, 30),
+                "start_date": created_at,
+                "end_date": created_at + timedelta(days=rng.randint(30, 365)),
+                "created_by": ADMIN_EMAIL,
+                "status": "In Progress",
+                "created_at": created_at,
+            }
+        elif kind == "services":
+            yield {
+                "title": f"Service {i}",
+                "imageUrls": [_image(media_base_url, "services", i)],
+                "description": _text(rng, 30),
+            }
+
+
+async def _insert(collection, documents, batch_size: int = 1000):
+    ids = []
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) == batch_size:
+            ids.extend((await collection.insert_many(batch)).inserted_ids)
+            batch = []
+    if batch:
+        ids.extend((await collection.insert_many(batch)).inserted_ids)
+    return [str(_id) for _id in ids]
+
+
+async def seed(client, volumes: dict, disposable: int, media_base_url: str, reset: bool = False, random_seed: int = 1):
+    """
+    Insert `volumes` documents per collection, plus `disposable` extra ones
+    per collection for delete benchmarks to consume. Returns the IDs of
+    both, and the credentials of a seeded admin and user.
+    """
+    from app.auth import get_password_hash
+
+    rng = random.Random(random_seed)
+    # One bcrypt hash shared by every seeded account keeps seeding fast
+    password_hash = get_password_hash(BENCH_PASSWORD)
+
+    if reset:
+        for database, _ in COLLECTIONS.values():
+            await client.drop_database(database)
+        await client.drop_database("usage_database")
+
+    manifest = {"ids": {}, "disposable": {}}
+    for kind, count in volumes.items():
+        database, name = COLLECTIONS[kind]
+        collection = client[database][name]
+        manifest["ids"][kind] = await _insert(collection, _documents(kind, count, rng, password_hash, media_base_url))
+        manifest["disposable"][kind] = await _insert(
+            collection, _documents(kind, disposable, rng, password_hash, media_base_url, offset=count)
+        )
+
+    admins = client["admins_database"]["admins"]
+    await admins.delete_many({"email": ADMIN_EMAIL})
+    await admins.insert_one({
+        "name": "Bench Admin",
+        "email": ADMIN_EMAIL,
+        "password": password_hash,
+        "phone": "+254700000000",
+        "role": "admin",
+    })
+    users = client["users_database"]["users"]
+    await users.delete_many({"email": USER_EMAIL})
+    await users.insert_one({
+        "name": "Bench User",
+        "email": USER_EMAIL,
+        "password": password_hash,
+        "phone": None,
+        "profile_picture": None,
+        "bio": None,
+        "googleId": None,
+        "role": "user",
+        "is_active": True,
+    })
+
+    manifest["admin"] = {"email": ADMIN_EMAIL, "password": BENCH_PASSWORD}
+    manifest["user"] = {"email": USER_EMAIL, "password": BENCH_PASSWORD}
+    return manifest
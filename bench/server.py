@@ -0,0 +1,71 @@
+"""
+Run the API for benchmarking: seed the databases, install the local fakes
+and serve with uvicorn, all in one process and event loop.
+
+    python -m bench.server --port 8765 --manifest /tmp/manifest.json [--in-memory]
+
+Started by bench.harness; the manifest it writes holds the seeded IDs and
+credentials, and appears before the server starts accepting requests.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--manifest", required=True)
+    parser.add_argument("--mongo-uri", default="mongodb://127.0.0.1:27017")
+    parser.add_argument("--in-memory", action="store_true", help="use mongomock-motor instead of MongoDB")
+    parser.add_argument("--reset", action="store_true", help="drop the app's databases before seeding")
+    parser.add_argument("--volumes", default="{}", help="JSON object of collection -> document count")
+    parser.add_argument("--disposable", type=int, default=0, help="extra documents per collection for delete benchmarks")
+    parser.add_argument("--email-url", default="http://127.0.0.1:9/send")
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    # Settings are read at import time, so they go in before the app is imported
+    os.environ["MONGO_URI"] = args.mongo_uri
+    os.environ["EMAIL_WEB_URL"] = args.email_url
+    os.environ["MEDIA_STORAGE"] = "local"
+    os.environ["MEDIA_BASE_URL"] = base_url
+    os.environ.setdefault("MEDIA_ROOT", tempfile.mkdtemp(prefix="bench-media-"))
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-secret")
+
+    if args.in_memory:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("--in-memory requires the mongomock-motor package")
+        import app.db.connection as connection
+        connection.client = connection.db = AsyncMongoMockClient()
+
+    import uvicorn
+    from app.main import app
+    from app.db.connection import db
+    from bench.fakes import install_google_fakes
+    from bench.seed import DEFAULT_VOLUMES, seed
+
+    install_google_fakes()
+    volumes = {**DEFAULT_VOLUMES, **json.loads(args.volumes)}
+
+    async def run():
+        # Seeding on the serving loop keeps Motor bound to a single event loop
+        manifest = await seed(db, volumes, args.disposable, base_url, reset=args.reset)
+        manifest["volumes"] = volumes
+        with open(args.manifest, "w") as f:
+            json.dump(manifest, f)
+
+        config = uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level=args.log_level, lifespan="on")
+        await uvicorn.Server(config).serve()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
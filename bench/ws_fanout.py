@@ -0,0 +1,233 @@
+"""
+WebSocket fan-out load test for /ws/notifications.
+
+    python -m bench.ws_fanout [--connections 500] [--slow-fraction 0.1] [--slow-delay 0.5]
+                              [--rate 20] [--duration 30] [--in-memory | --mongo-uri URI]
+
+Opens N admin sockets, a fraction of which read deliberately slowly, then
+submits contact messages at a fixed rate. Every submission is broadcast to
+every socket; the report has end-to-end notification latency for fast and
+slow readers, contact POST latency, how many sockets the server evicted, and
+the server worker's memory per connection. WS_SEND_QUEUE_SIZE and friends
+are passed through to the server from the environment.
+"""
+import argparse
+import asyncio
+import json
+import resource
+import sys
+import time
+from collections import Counter
+
+import httpx
+import psutil
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+from bench.harness import add_server_arguments, launch_server, login_admin, percentiles, report_meta, write_report
+
+# Prefix of the contact-message name that carries the submission's sequence number
+MARKER = "ws-bench "
+
+
+class Reader:
+    def __init__(self, slow: bool):
+        self.slow = slow
+        self.latencies = []
+        self.close_code = None
+        self.error = None
+
+
+def raise_file_limit():
+    # Every socket is a file descriptor on both ends; the server inherits this limit
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def worker_rss(pid: int):
+    return psutil.Process(pid).memory_info().rss
+
+
+async def read_notifications(websocket, reader: Reader, sent: dict, slow_delay: float):
+    try:
+        async for frame in websocket:
+            received = time.perf_counter()
+            event = json.loads(frame)
+            name = event.get("name") or ""
+            if name.startswith(MARKER):
+                seq = int(name[len(MARKER):])
+                if seq in sent:
+                    reader.latencies.append(received - sent[seq])
+            if reader.slow:
+                await asyncio.sleep(slow_delay)
+    except ConnectionClosed as e:
+        reader.close_code = e.rcvd.code if e.rcvd else None
+
+
+async def open_readers(ws_url: str, args, sent: dict):
+    readers, sockets, tasks = [], [], []
+    semaphore = asyncio.Semaphore(args.connect_concurrency)
+    slow_count = int(args.connections * args.slow_fraction)
+
+    async def open_one(index: int):
+        reader = Reader(slow=index < slow_count)
+        readers.append(reader)
+        async with semaphore:
+            try:
+                # A one-frame client buffer makes a slow reader push back on the server instead of buffering here
+                websocket = await connect(ws_url, max_queue=1 if reader.slow else 16, open_timeout=30)
+            except Exception as e:
+                reader.error = type(e).__name__
+                return
+        sockets.append(websocket)
+        tasks.append(asyncio.create_task(read_notifications(websocket, reader, sent, args.slow_delay)))
+
+    began = time.perf_counter()
+    await asyncio.gather(*(open_one(i) for i in range(args.connections)))
+    return readers, sockets, tasks, time.perf_counter() - began
+
+
+async def submit_messages(client: httpx.AsyncClient, args, sent: dict):
+    # Open loop: submissions go out on schedule whether or not earlier ones have finished
+    latencies = []
+    statuses = Counter()
+
+    async def submit(seq: int):
+        sent[seq] = began = time.perf_counter()
+        try:
+            response = await client.post("/api/contact/", json={
+                "name": f"{MARKER}{seq}",
+                "email": f"ws-bench-{seq}@bench.example.com",
+                "message": "WebSocket fan-out benchmark",
+                "category": "sales",
+            })
+            statuses[str(response.status_code)] += 1
+        except httpx.HTTPError as e:
+            statuses[type(e).__name__] += 1
+        latencies.append(time.perf_counter() - began)
+
+    total = int(args.rate * args.duration)
+    start = time.perf_counter()
+    submissions = []
+    for seq in range(total):
+        delay = start + seq / args.rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        submissions.append(asyncio.create_task(submit(seq)))
+    await asyncio.gather(*submissions)
+    return latencies, statuses, total
+
+
+async def sample_rss(pid: int, peak: list, interval: float = 0.5):
+    while True:
+        peak[0] = max(peak[0], worker_rss(pid))
+        await asyncio.sleep(interval)
+
+
+async def run(server, args):
+    pid = server.process.pid
+    limits = httpx.Limits(max_connections=64)
+    async with httpx.AsyncClient(base_url=server.base_url, limits=limits, timeout=60) as client:
+        token = (await login_admin(client, server.manifest))["access_token"]
+        admin = {"Authorization": f"Bearer {token}"}
+        # A few requests first so the baseline includes a warmed-up worker
+        for _ in range(5):
+            await client.get("/ws/notifications/stats", headers=admin)
+        baseline_rss = worker_rss(pid)
+
+        sent = {}
+        ws_url = server.base_url.replace("http", "ws", 1) + f"/ws/notifications?token={token}&topics=messages"
+        readers, sockets, tasks, connect_seconds = await open_readers(ws_url, args, sent)
+        await asyncio.sleep(1)
+        connected_rss = worker_rss(pid)
+        connected = len(sockets)
+
+        peak = [connected_rss]
+        sampler = asyncio.create_task(sample_rss(pid, peak))
+        post_latencies, statuses, total = await submit_messages(client, args, sent)
+        # Let queued frames reach the sockets that are still keeping up
+        await asyncio.sleep(args.drain)
+        stats = (await client.get("/ws/notifications/stats", headers=admin)).json()
+        sampler.cancel()
+
+        for websocket in sockets:
+            await websocket.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def delivery(group):
+        latencies = [latency for reader in group for latency in reader.latencies]
+        return {
+            "sockets": len(group),
+            "delivered": len(latencies),
+            "expected": len(group) * total,
+            "closed_by_server": dict(Counter(str(reader.close_code) for reader in group if reader.close_code is not None)),
+            **percentiles(latencies),
+        }
+
+    connected_readers = [reader for reader in readers if reader.error is None]
+    return {
+        "connections": {
+            "requested": args.connections,
+            "connected": connected,
+            "failed": dict(Counter(reader.error for reader in readers if reader.error)),
+            "connect_seconds": round(connect_seconds, 3),
+        },
+        "notifications": {
+            "fast": delivery([reader for reader in connected_readers if not reader.slow]),
+            "slow": delivery([reader for reader in connected_readers if reader.slow]),
+        },
+        "posts": {
+            "submitted": total,
+            "statuses": dict(statuses),
+            **percentiles(post_latencies),
+        },
+        "memory": {
+            "baseline_rss_bytes": baseline_rss,
+            "connected_rss_bytes": connected_rss,
+            "peak_rss_bytes": peak[0],
+            "bytes_per_connection": round((connected_rss - baseline_rss) / connected) if connected else None,
+        },
+        "server_stats": stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_server_arguments(parser)
+    parser.add_argument("--connections", type=int, default=500)
+    parser.add_argument("--slow-fraction", type=float, default=0.1, help="share of sockets that read slowly")
+    parser.add_argument("--slow-delay", type=float, default=0.5, help="seconds a slow reader pauses after each frame")
+    parser.add_argument("--rate", type=float, default=20, help="contact submissions per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of submissions")
+    parser.add_argument("--drain", type=float, default=5, help="seconds to wait for deliveries after the last submission")
+    parser.add_argument("--connect-concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    file_limit = raise_file_limit()
+    if args.connections + 200 > file_limit:
+        sys.exit(f"--connections {args.connections} needs more file descriptors than the limit of {file_limit}")
+
+    # Only the one worker process, so its memory is the whole story
+    with launch_server(args) as server:
+        results = asyncio.run(run(server, args))
+        emails = server.webhook.received
+
+    report = {
+        "meta": report_meta(
+            connections=args.connections,
+            slow_fraction=args.slow_fraction,
+            slow_delay_s=args.slow_delay,
+            rate_per_s=args.rate,
+            duration_s=args.duration,
+            database="in-memory" if args.in_memory else "mongodb",
+            emails_sent=emails,
+        ),
+        **results,
+    }
+    write_report(report, args.out)
+
+
+if __name__ == "__main__":
+    main()